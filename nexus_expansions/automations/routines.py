@@ -38,10 +38,9 @@ def run_deep_work(server):
     """
     print("[Automation] Engaging Deep Work Mode...")
     try:
-        # 1. Kill Distractions (Case insensitive)
+        # 1. Kill Distractions (Case insensitive, every instance, one process scan)
         distractions = ["discord", "steam", "whatsapp", "teams"]
-        for d in distractions:
-            server.kill_process(d)
+        server.kill_processes(distractions, tree=True)
             
         # 2. Launch Music
         server.launch_application("spotify")
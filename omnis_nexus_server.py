@@ -16,13 +16,35 @@ import time
 import json
 import logging
 import threading
+import asyncio
+import atexit
+import base64
+import codecs
+import bisect
+import fnmatch
+import gzip
 import hashlib
+import heapq
+import itertools
+import mmap
+import queue
+import concurrent.futures
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import re
+import shlex
+import sqlite3
+import stat
+import uuid
+import zlib
+from array import array
+from types import MappingProxyType
 import schedule
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Tuple, Union, Iterator
 from datetime import datetime
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
 
 # Initialize FastMCP Server
 mcp = FastMCP("Omnis-Nexus-Enhanced")
@@ -31,9 +53,11 @@ mcp = FastMCP("Omnis-Nexus-Enhanced")
 
 LOG_DIR = Path("./logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
-AUDIT_LOG = Path("./audit.log")
+AUDIT_LOG = Path("./audit.jsonl")
 ROLLBACK_DIR = Path("./.rollback")
 ROLLBACK_DIR.mkdir(parents=True, exist_ok=True)
+INDEX_DIR = Path("./.nexus_index")
+TELEMETRY_DIR = Path("./.nexus_telemetry")
 
 # Logger configuration
 logger = logging.getLogger("OmnisNexus")
@@ -46,13 +70,64 @@ file_handler = RotatingFileHandler(
 file_handler.setLevel(logging.DEBUG)
 file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
 
 stderr_handler = logging.StreamHandler(sys.stderr)
 stderr_handler.setLevel(logging.WARNING)
 stderr_formatter = logging.Formatter('%(levelname)s: %(message)s')
 stderr_handler.setFormatter(stderr_formatter)
-logger.addHandler(stderr_handler)
+
+class RateLimitFilter(logging.Filter):
+    """Caps DEBUG records per (logger, message template) per window; counts what it suppresses."""
+
+    def __init__(self, rate: int = 20, window: float = 10.0):
+        super().__init__()
+        self.rate, self.window = rate, window
+        self.buckets: Dict[tuple, list] = {}
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                dropped = bucket[2] if bucket else 0
+                self.buckets[key] = [now, 1, 0]
+                if len(self.buckets) > 1000:
+                    self.buckets = {k: v for k, v in self.buckets.items() if now - v[0] < self.window}
+                if dropped:
+                    record.msg = f"{record.msg} [{dropped} similar suppressed]"
+                return True
+            if bucket[1] < self.rate:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            self.suppressed += 1
+            return False
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# File and stderr I/O happen on the listener thread, never on the calling tool's thread.
+log_queue: queue.Queue = queue.Queue(maxsize=10000)
+log_rate_filter = RateLimitFilter()
+queue_handler = DroppingQueueHandler(log_queue)
+queue_handler.addFilter(log_rate_filter)
+logger.addHandler(queue_handler)
+log_listener = QueueListener(log_queue, file_handler, stderr_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logger.info("Omnis-Nexus Enhanced Server Initializing...")
 
@@ -64,8 +139,50 @@ DEFAULT_CONFIG = {
     "max_rollback_versions": 5,
     "command_whitelist_enabled": False,
     "audit_enabled": True,
+    "log_level": "DEBUG",
+    "log_debug_rate": 20,
+    "log_rate_window": 10,
+    "audit_queue_size": 10000,
+    "audit_overflow": "block",
+    "audit_flush_interval": 0.5,
+    "audit_fsync": "batch",
+    "audit_max_bytes": 10 * 1024 * 1024,
+    "audit_backup_count": 10,
+    "audit_details_max": 1024,
     "allowed_commands": ["ls", "dir", "echo", "cat", "type"],
-    "blocked_commands": ["rm -rf", "del /s", "format"]
+    "blocked_commands": ["rm -rf", "del /s", "format"],
+    "allow_roots": [],
+    "deny_roots": [],
+    "deny_globs": [],
+    "path_cache_size": 4096,
+    "shell_pool_size": 2,
+    "shell_max_sessions": 16,
+    "shell_idle_timeout": 600,
+    "output_spill_bytes": 1024 * 1024,
+    "output_spill_retention": 50,
+    "job_max_concurrency": 4,
+    "job_default_timeout": 3600,
+    "job_retention": 100,
+    "batch_max_workers": 8,
+    "batch_max_calls": 64,
+    "search_workers": 8,
+    "search_max_file_bytes": 100 * 1024 * 1024,
+    "index_enabled": True,
+    "index_interval": 300,
+    "index_max_file_bytes": 2 * 1024 * 1024,
+    "telemetry_interval": 2.0,
+    "telemetry_disk_interval": 30,
+    "disk_probe_timeout": 2.0,
+    "disk_probe_workers": 8,
+    "disk_stats_ttl": 5.0,
+    "io_rate_history": 300,
+    "history_max_metrics": 64,
+    "history_snapshot_interval": 300,
+    "process_cache_ttl": 2.0,
+    "process_sample_interval": 2.0,
+    "process_change_history": 300,
+    "process_change_cpu": 5.0,
+    "process_change_rss_mb": 10.0
 }
 
 def _load_config() -> Dict:
@@ -74,7 +191,7 @@ def _load_config() -> Dict:
             with open(CONFIG_FILE, 'r') as f:
                 return {**DEFAULT_CONFIG, **json.load(f)}
         except Exception as e:
-            logger.warning(f"Config load failed: {e}")
+            logger.warning("Config load failed: %s", e)
     return DEFAULT_CONFIG.copy()
 
 def _save_config(config: Dict) -> None:
@@ -82,27 +199,260 @@ def _save_config(config: Dict) -> None:
         with open(CONFIG_FILE, 'w') as f:
             json.dump(config, f, indent=2)
     except Exception as e:
-        logger.error(f"Config save failed: {e}")
+        logger.error("Config save failed: %s", e)
 
 CONFIG = _load_config()
 if "OMNIS_SAFE_ZONE" in os.environ:
     CONFIG["safe_zone"] = os.environ["OMNIS_SAFE_ZONE"]
 
+def _apply_logging_config() -> None:
+    logger.setLevel(str(CONFIG.get("log_level", "DEBUG")).upper())
+    log_rate_filter.rate = CONFIG.get("log_debug_rate", 20)
+    log_rate_filter.window = CONFIG.get("log_rate_window", 10)
+
+_apply_logging_config()
+
 SAFE_ZONE = Path(CONFIG["safe_zone"]).resolve()
 SCREENSHOT_DIR = Path(CONFIG["screenshot_dir"])
 SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Audit logging
-def _audit_log(action: str, details: str, success: bool = True):
+class AuditWriter:
+    """Bounded queue of audit records drained to JSONL by a background thread.
+
+    audit_overflow="block" makes callers wait for queue space; "drop" discards the
+    record and counts it in `dropped`. Segments over audit_max_bytes are rotated
+    and gzip-compressed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.queue: queue.Queue = queue.Queue(maxsize=CONFIG.get("audit_queue_size", 10000))
+        self.lock = threading.Lock()
+        self.file = None
+        self.dropped = self.written = self.rotations = 0
+        threading.Thread(target=self._run, daemon=True, name="omnis-audit").start()
+
+    def submit(self, record: Dict) -> None:
+        if CONFIG.get("audit_overflow", "block") != "drop":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + CONFIG.get("audit_flush_interval", 0.5)
+            while len(batch) < 1000:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error("Audit write failed: %s", e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, batch: List[Dict]) -> None:
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        self.file.write("".join(json.dumps(r, default=str) + "\n" for r in batch).encode("utf-8"))
+        self.file.flush()
+        if CONFIG.get("audit_fsync", "batch") == "batch":
+            os.fsync(self.file.fileno())
+        self.written += len(batch)
+        if self.file.tell() >= CONFIG.get("audit_max_bytes", 10 * 1024 * 1024):
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self.file.close()
+        self.file = None
+        segment = self.path.with_name(f"{self.path.name}.{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+        os.replace(self.path, segment)
+        _compress_audit_segment(segment, Path(f"{segment}.gz"))
+        segment.unlink()
+        self.rotations += 1
+        segments = sorted(self.path.parent.glob(f"{self.path.name}.*.gz"))
+        for old in segments[:-CONFIG.get("audit_backup_count", 10)]:
+            old.unlink(missing_ok=True)
+            Path(f"{old}.idx").unlink(missing_ok=True)
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self.queue.join()
+
+    def status(self) -> Dict:
+        return {
+            "path": str(self.path.resolve()),
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "overflow_policy": CONFIG.get("audit_overflow", "block"),
+            "fsync": CONFIG.get("audit_fsync", "batch")
+        }
+
+AUDIT_INDEX_BLOCK = 256 * 1024
+
+def _compress_audit_segment(src_path: Path, gz_path: Path) -> None:
+    """Gzip a segment as independent members per block, with a sidecar [first_ts, offset] index.
+
+    Each member starts on a record boundary, so readers can seek straight to a block.
+    """
+    index = []
+    with open(src_path, "rb") as src, open(gz_path, "wb") as dst:
+        while block := src.read(AUDIT_INDEX_BLOCK):
+            block += src.readline()
+            try:
+                index.append([json.loads(block[:block.index(b"\n") + 1])["ts"], dst.tell()])
+            except (ValueError, KeyError):
+                pass
+            dst.write(gzip.compress(block))
+    with open(f"{gz_path}.idx", "w") as f:
+        json.dump(index, f)
+
+AUDIT_WRITER = AuditWriter(AUDIT_LOG)
+atexit.register(AUDIT_WRITER.flush)
+
+def _audit_log(action: str, details: str, success: bool = True, duration_ms: Optional[float] = None):
+    """Queue an audit record; details over audit_details_max are kept as a preview plus the full digest."""
     if CONFIG.get("audit_enabled"):
-        with open(AUDIT_LOG, 'a') as f:
-            f.write(f"{datetime.now().isoformat()} | {'SUCCESS' if success else 'FAILED'} | {action} | {details}\n")
+        record = {
+            "ts": datetime.now().isoformat(),
+            "action": action,
+            "success": success,
+            "details": details,
+            "digest": hashlib.sha256(details.encode("utf-8", errors="replace")).hexdigest()[:16],
+            "duration_ms": duration_ms
+        }
+        limit = CONFIG.get("audit_details_max", 1024)
+        if len(details) > limit:
+            record["details"] = details[:limit]
+            record["details_truncated"] = True
+        AUDIT_WRITER.submit(record)
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() start, rounded for audit records."""
+    return round((time.perf_counter() - start) * 1000, 2)
 
 # --- Safety & Validation ---
 
+PATH_POLICY_KEYS = ("safe_zone", "allow_roots", "deny_roots", "deny_globs", "path_cache_size")
+
+class PathPolicy:
+    """Allow/deny roots and deny globs compiled once, with an LRU of resolved directories.
+
+    A cached resolution is reused only while it provably still holds: every component of the
+    resolved path is lstat'ed and must still be a real directory, not a symlink, and the requested
+    directory must still stat to the same device/inode. A retargeted symlink, or a directory
+    moved away and replaced by a symlink, therefore invalidates the entry.
+    """
+
+    def __init__(self, safe_zone: Path, config: Dict):
+        norm = lambda p: os.path.normcase(str(Path(p).resolve()))
+        self.allow = [norm(safe_zone)] + [norm(r) for r in config.get("allow_roots", [])]
+        self.deny = [norm(r) for r in config.get("deny_roots", [])]
+        globs = config.get("deny_globs", [])
+        self.deny_glob = re.compile("|".join(fnmatch.translate(os.path.normcase(g)) for g in globs)) if globs else None
+        self.cache_size = config.get("path_cache_size", 4096)
+        self.dirs: "OrderedDict[str, Tuple[str, Tuple[int, int]]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _still_resolves(resolved: str, ident: Tuple[int, int]) -> bool:
+        """True if realpath output `resolved` is still symlink-free and still names inode `ident`."""
+        path, leaf = resolved, True
+        while True:
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode) or (leaf and (st.st_dev, st.st_ino) != ident):
+                return False
+            parent = os.path.dirname(path)
+            if parent == path:
+                return True
+            path, leaf = parent, False
+
+    def _resolve_dir(self, directory: str) -> str:
+        st = os.stat(directory)
+        ident = (st.st_dev, st.st_ino)
+        with self.lock:
+            cached = self.dirs.get(directory)
+        if cached and cached[1] == ident:
+            try:
+                valid = self._still_resolves(cached[0], ident)
+            except OSError:
+                valid = False
+            if valid:
+                with self.lock:
+                    if directory in self.dirs:
+                        self.dirs.move_to_end(directory)
+                return cached[0]
+        resolved = os.path.realpath(directory)
+        with self.lock:
+            self.dirs[directory] = (resolved, ident)
+            while len(self.dirs) > self.cache_size:
+                self.dirs.popitem(last=False)
+        return resolved
+
+    def resolve(self, path: Union[str, Path]) -> str:
+        raw = os.path.abspath(os.fspath(path)) if ".." not in Path(path).parts else None
+        if raw is None:
+            return os.path.realpath(path)
+        directory, name = os.path.split(raw)
+        try:
+            if name and stat.S_ISLNK(os.lstat(raw).st_mode):
+                return os.path.realpath(raw)
+        except OSError:
+            pass  # not created yet; its directory decides
+        try:
+            parent = self._resolve_dir(directory)
+        except OSError:
+            return os.path.realpath(raw)
+        return os.path.join(parent, name) if name else parent
+
+    @staticmethod
+    def _within(path: str, roots: List[str]) -> bool:
+        return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+
+    def check(self, path: Union[str, Path]) -> Tuple[bool, str, str]:
+        """(allowed, resolved_path, reason)."""
+        resolved = os.path.normcase(self.resolve(path))
+        if self._within(resolved, self.deny):
+            return False, resolved, "inside a denied root"
+        if self.deny_glob and self.deny_glob.match(resolved):
+            return False, resolved, "matches a denied glob"
+        if self._within(resolved, self.allow):
+            return True, resolved, "ok"
+        return False, resolved, "outside allowed roots"
+
+_path_policy: Optional[PathPolicy] = None
+_path_policy_key: Optional[tuple] = None
+
+def _get_path_policy() -> PathPolicy:
+    """Compiled path policy, rebuilt when SAFE_ZONE or a path policy value changes, in place or not.
+
+    Root and glob lists are short, so keying on their contents is cheap.
+    """
+    global _path_policy, _path_policy_key
+    key = (SAFE_ZONE,) + tuple(tuple(v) if isinstance(v, list) else v
+                               for v in (CONFIG.get(k) for k in PATH_POLICY_KEYS[1:]))
+    if _path_policy is None or key != _path_policy_key:
+        _path_policy, _path_policy_key = PathPolicy(SAFE_ZONE, CONFIG), key
+    return _path_policy
+
 def _is_safe_path(path: Union[str, Path]) -> bool:
     try:
-        return Path(path).resolve().is_relative_to(SAFE_ZONE)
+        return _get_path_policy().check(path)[0]
     except:
         return False
 
@@ -110,137 +460,1118 @@ def _validate_access(path: Union[str, Path], force: bool = False) -> None:
     if not _is_safe_path(path) and not force:
         raise PermissionError(f"RESTRICTED: {path} outside SAFE_ZONE. Use force=True.")
 
+# --- Command Policy ---
+
+CRITICAL_BLOCKS = ["rm -rf", "format c:", "mkfs", ":(){ :|:& };:"] # Fork bomb
+POLICY_KEYS = ("command_whitelist_enabled", "blocked_commands", "allowed_commands")
+# shlex punctuation tokens that start a new command; redirections (<, >) do not.
+_COMMAND_SEPARATORS = {";", "&&", "||", "|", "&", "|&", ";;", "(", ")", "((", "))"}
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text regardless of pattern count."""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Optional[str]] = [None]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(None)
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node] = pattern
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, nxt in self.goto[node].items():
+                pending.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                if self.out[nxt] is None:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> Optional[str]:
+        """First pattern found in text, or None."""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+def _normalize_command(text: str) -> str:
+    # Normalize case and whitespace (rm  -rf -> rm -rf)
+    return " ".join(text.lower().split())
+
+def _split_command(command: str) -> Optional[List[List[str]]]:
+    """shlex-tokenize a command line into per-command argv segments; None if it can't be parsed."""
+    lexer = shlex.shlex(command.replace("\n", " ; "), posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+    segments, current = [], []
+    for token in tokens:
+        if token in _COMMAND_SEPARATORS:
+            if current:
+                segments.append(current)
+            current = []
+        else:
+            current.append(token.lower())
+    if current:
+        segments.append(current)
+    return segments
+
+class CommandPolicy:
+    """Compiled form of the command lists in CONFIG."""
+
+    def __init__(self, config: Dict):
+        self.whitelist = config.get("command_whitelist_enabled", False)
+        blocked = [] if self.whitelist else config.get("blocked_commands", [])
+        self.blocks = AhoCorasick([_normalize_command(b) for b in CRITICAL_BLOCKS + list(blocked)])
+        self.allowed: Dict[str, List[List[str]]] = {}
+        for entry in config.get("allowed_commands", []):
+            words = _normalize_command(entry).split()
+            if words:
+                self.allowed.setdefault(words[0], []).append(words)
+
+    def check(self, command: str) -> Tuple[bool, str]:
+        """(allowed, reason) for a full command line, including chained commands."""
+        segments = _split_command(command)
+        texts = [_normalize_command(command)]
+        if segments is not None:
+            # De-quoted argv catches rm "-rf" and friends.
+            texts.extend(" ".join(argv) for argv in segments)
+        for text in texts:
+            hit = self.blocks.search(text)
+            if hit:
+                return False, f"blocked pattern: {hit}"
+        if not self.whitelist:
+            return True, "ok"
+
+        if segments is None:
+            return False, "unparseable command in whitelist mode"
+        if "$(" in command or "`" in command:
+            return False, "command substitution not allowed in whitelist mode"
+        if "<(" in command or ">(" in command:
+            return False, "process substitution not allowed in whitelist mode"
+        if not segments:
+            return False, "empty command"
+        for argv in segments:
+            prefixes = self.allowed.get(argv[0], [])
+            if not any(argv[:len(words)] == words for words in prefixes):
+                return False, f"not whitelisted: {argv[0]}"
+        return True, "ok"
+
+_policy: Optional[CommandPolicy] = None
+_policy_sources: tuple = ()  # the CONFIG objects the policy was compiled from, held to compare by identity
+_policy_lock = threading.Lock()
+
+def _get_policy() -> CommandPolicy:
+    """Compiled policy, rebuilt when a policy value is replaced or _invalidate_policy runs.
+
+    The check is an identity test per key, so it costs the same at any pattern count. set_config
+    invalidates; code that edits a policy list in place must call _invalidate_policy itself.
+    """
+    global _policy, _policy_sources
+    sources = tuple(CONFIG.get(k) for k in POLICY_KEYS)
+    policy = _policy
+    if policy is None or any(a is not b for a, b in zip(sources, _policy_sources)):
+        with _policy_lock:
+            policy = CommandPolicy(CONFIG)
+            _policy, _policy_sources = policy, sources
+    return policy
+
+def _invalidate_policy() -> None:
+    global _policy
+    _policy = None
+
+def _check_command(command: str) -> Tuple[bool, str]:
+    return _get_policy().check(command)
+
 def _validate_command(command: str) -> bool:
     """Check if command is safe to execute."""
-    # Fail Secure: If whitelist enabled but empty, block everything? 
-    # Current config logic: if whitelist_enabled is False, allow all except blocked.
-    
-    cmd_lower = command.lower()
-    
-    # 1. Global Blocking (Always active)
-    CRITICAL_BLOCKS = ["rm -rf", "format c:", "mkfs", ":(){ :|:& };:"] # Fork bomb
-    
-    # Normalize whitespace (rm  -rf -> rm -rf)
-    cmd_normalized = ' '.join(cmd_lower.split())
-    
-    for block in CRITICAL_BLOCKS:
-        if block in cmd_normalized:
+    return _check_command(command)[0]
+
+class RollbackStore:
+    """Content-addressed, zlib-compressed file versions indexed by full path in SQLite."""
+
+    def __init__(self, root: Path):
+        self.objects = root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(root / "index.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, digest TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_versions_path ON versions(path, id)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_versions_digest ON versions(digest)")
+        self.db.commit()
+
+    def _blob(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def snapshot(self, path: Path, keep: int) -> Optional[int]:
+        """Store the current content of path; returns the version id."""
+        key = str(path.resolve())
+        tmp = self.objects / f"tmp-{uuid.uuid4().hex}"
+        digest, size = hashlib.sha256(), 0
+        compressor = zlib.compressobj(6)
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                digest.update(chunk)
+                size += len(chunk)
+                dst.write(compressor.compress(chunk))
+            dst.write(compressor.flush())
+        digest = digest.hexdigest()
+
+        with self.lock:
+            blob = self._blob(digest)
+            if blob.exists():
+                tmp.unlink()
+            else:
+                blob.parent.mkdir(exist_ok=True)
+                os.replace(tmp, blob)
+            latest = self.db.execute(
+                "SELECT id, digest FROM versions WHERE path = ? ORDER BY id DESC LIMIT 1", (key,)
+            ).fetchone()
+            if latest and latest[1] == digest:
+                return latest[0]
+            version = self.db.execute(
+                "INSERT INTO versions (path, digest, size, created) VALUES (?, ?, ?, ?)",
+                (key, digest, size, time.time())
+            ).lastrowid
+            stale = self.db.execute(
+                "SELECT id, digest FROM versions WHERE path = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (key, max(1, keep))
+            ).fetchall()
+            if stale:
+                self.db.executemany("DELETE FROM versions WHERE id = ?", [(vid,) for vid, _ in stale])
+                for old_digest in {d for _, d in stale}:
+                    if not self.db.execute("SELECT 1 FROM versions WHERE digest = ? LIMIT 1", (old_digest,)).fetchone():
+                        self._blob(old_digest).unlink(missing_ok=True)
+            self.db.commit()
+        return version
+
+    def versions(self, path: Path) -> List[Dict]:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, digest, size, created FROM versions WHERE path = ? ORDER BY id DESC",
+                (str(path.resolve()),)
+            ).fetchall()
+        return [{"version": vid, "digest": digest, "size": size,
+                 "created": datetime.fromtimestamp(created).isoformat()} for vid, digest, size, created in rows]
+
+    def open_version(self, path: Path, version: int):
+        """Yield decompressed chunks of a stored version."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT digest FROM versions WHERE path = ? AND id = ?", (str(path.resolve()), version)
+            ).fetchone()
+        if not row:
+            raise KeyError(f"No version {version} for {path}")
+        decompressor = zlib.decompressobj()
+        with open(self._blob(row[0]), "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+ROLLBACK_STORE = RollbackStore(ROLLBACK_DIR)
+
+@contextmanager
+def _atomic_open(path: Path, mode: str = "wb", **kwargs):
+    """Write to a temp file in the same directory, fsync, then rename over path.
+
+    A symlink is resolved first so the write lands on its target, as a plain open() would;
+    the parent directory must already exist.
+    """
+    path = path.resolve()
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def _create_rollback(path: Path) -> Optional[int]:
+    """Snapshot the file into the rollback store before it is modified."""
+    if path.is_file():
+        return ROLLBACK_STORE.snapshot(path, CONFIG.get("max_rollback_versions", 5))
+    return None
+
+# === TELEMETRY SAMPLER ===
+
+HISTORY_TIERS = ((1, 600), (60, 1440), (900, 2880))  # 10 min @ 1s, 24 h @ 1 min, 30 days @ 15 min
+HISTORY_FIELDS = ("bucket", "min", "max", "sum", "count")
+
+class MetricSeries:
+    """One fixed-size ring of min/max/sum/count per resolution tier; slot = bucket % capacity."""
+
+    def __init__(self):
+        self.tiers = [{field: array("d", bytes(8 * cap)) for field in HISTORY_FIELDS}
+                      for _, cap in HISTORY_TIERS]
+
+    def add(self, ts: float, value: float) -> None:
+        for (step, cap), tier in zip(HISTORY_TIERS, self.tiers):
+            bucket = ts // step
+            slot = int(bucket) % cap
+            if tier["bucket"][slot] != bucket:
+                tier["bucket"][slot] = bucket
+                tier["min"][slot] = tier["max"][slot] = tier["sum"][slot] = value
+                tier["count"][slot] = 1
+            else:
+                tier["min"][slot] = min(tier["min"][slot], value)
+                tier["max"][slot] = max(tier["max"][slot], value)
+                tier["sum"][slot] += value
+                tier["count"][slot] += 1
+
+    def query(self, level: int, start: float, end: float) -> List[list]:
+        step, cap = HISTORY_TIERS[level]
+        tier = self.tiers[level]
+        last = int(end // step)
+        rows = []
+        for bucket in range(max(int(start // step), last - cap + 1), last + 1):
+            slot = bucket % cap
+            if tier["bucket"][slot] == bucket:
+                count = tier["count"][slot]
+                rows.append([bucket * step, tier["min"][slot], tier["max"][slot],
+                             round(tier["sum"][slot] / count, 3)])
+        return rows
+
+class TimeSeriesStore:
+    """Bounded in-memory history for telemetry metrics, snapshotted to a flat binary file."""
+
+    def __init__(self, path: Path, max_metrics: int = 64):
+        self.path = path
+        self.max_metrics = max_metrics
+        self.series: Dict[str, MetricSeries] = {}
+        self.lock = threading.Lock()
+        self.dropped_metrics = 0
+
+    def record(self, values: Dict[str, float], ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            for name, value in values.items():
+                series = self.series.get(name)
+                if series is None:
+                    if len(self.series) >= self.max_metrics:
+                        self.dropped_metrics += 1
+                        continue
+                    series = self.series[name] = MetricSeries()
+                series.add(ts, float(value))
+
+    def query(self, name: str, window: float, level: int, now: Optional[float] = None) -> Optional[List[list]]:
+        now = time.time() if now is None else now
+        with self.lock:
+            series = self.series.get(name)
+            return None if series is None else series.query(level, now - window, now)
+
+    def metrics(self) -> List[str]:
+        with self.lock:
+            return sorted(self.series)
+
+    def memory_bytes(self) -> int:
+        per_series = sum(cap for _, cap in HISTORY_TIERS) * len(HISTORY_FIELDS) * 8
+        return per_series * len(self.series)
+
+    def save(self) -> None:
+        with self.lock:
+            names = sorted(self.series)
+            header = {"version": 1, "tiers": HISTORY_TIERS, "metrics": names}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with _atomic_open(self.path, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                for name in names:
+                    for tier in self.series[name].tiers:
+                        for field in HISTORY_FIELDS:
+                            tier[field].tofile(f)
+
+    def load(self) -> bool:
+        """Restore a snapshot; one written with a different tier layout is ignored."""
+        if not self.path.exists():
             return False
-
-    # 2. Configurable Blocking
-    if not CONFIG.get("command_whitelist_enabled", False):
-        # Blacklist Mode
-        blocked_cmds = CONFIG.get("blocked_commands", [])
-        for blocked in blocked_cmds:
-             if blocked in cmd_normalized: 
-                 return False
+        try:
+            with open(self.path, "rb") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != 1 or [tuple(t) for t in header["tiers"]] != list(HISTORY_TIERS):
+                    return False
+                loaded = {}
+                for name in header["metrics"][:self.max_metrics]:
+                    series = MetricSeries()
+                    for (_, cap), tier in zip(HISTORY_TIERS, series.tiers):
+                        for field in HISTORY_FIELDS:
+                            tier[field] = array("d")
+                            tier[field].fromfile(f, cap)
+                    loaded[name] = series
+        except Exception as e:
+            logger.warning("Telemetry history load failed: %s", e)
+            return False
+        with self.lock:
+            self.series.update(loaded)
         return True
-    
-    # 3. Whitelist Mode (Strictest)
-    allowed_cmds = CONFIG.get("allowed_commands", [])
-    # Simple check: command must start with an allowed command
-    for allowed in allowed_cmds:
-        if cmd_lower.startswith(allowed.lower()):
-            return True
-            
-    return False
 
-def _create_rollback(path: Path) -> None:
-    """Create a rollback copy of the file."""
-    if path.exists():
-        rollback_path = ROLLBACK_DIR / f"{path.name}.{int(time.time())}"
-        shutil.copy2(path, rollback_path)
-        # Keep only last N versions
-        versions = sorted(ROLLBACK_DIR.glob(f"{path.name}.*"))
-        for old in versions[:-CONFIG.get("max_rollback_versions", 5)]:
-            old.unlink()
+HISTORY = TimeSeriesStore(TELEMETRY_DIR / "history.bin", CONFIG.get("history_max_metrics", 64))
+
+MOUNTINFO = Path("/proc/self/mountinfo")
+
+DISK_PROBE_MAX_STUCK = 4
+
+class DiskProber:
+    """disk_usage probes run in a pool with a per-mount timeout, so one stale NFS/FUSE mount
+    is reported as hung instead of blocking the caller.
+
+    The partition list is re-read only when /proc/self/mountinfo changes (or every minute
+    where it does not exist), and results are shared by all callers within disk_stats_ttl.
+
+    A hung disk_usage call never gives its thread back. When stuck probes leave too few workers
+    for the next round the pool is retired and replaced; once DISK_PROBE_MAX_STUCK times
+    disk_probe_workers threads are stuck overall, new probes are skipped instead.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.pending: Dict[str, concurrent.futures.Future] = {}
+        self.stuck: set = set()    # unfinished probes holding a thread of the current pool
+        self.retired: set = set()  # unfinished probes left behind in replaced pools
+        self.partitions: List = []
+        self.mount_sig: Optional[int] = None
+        self.partitions_at = 0.0
+        self.result: List[Dict] = []
+        self.result_at = 0.0
+        self.probes = 0
+
+    def _mount_signature(self) -> Optional[int]:
+        try:
+            return hash(MOUNTINFO.read_bytes())
+        except OSError:
+            return None
+
+    def _refresh_partitions(self) -> None:
+        sig = self._mount_signature()
+        stale = time.monotonic() - self.partitions_at > 60
+        if not self.partitions_at or (sig is None and stale) or (sig is not None and sig != self.mount_sig):
+            self.partitions = psutil.disk_partitions()
+            self.mount_sig, self.partitions_at = sig, time.monotonic()
+
+    def get(self, max_age: Optional[float] = None) -> List[Dict]:
+        ttl = CONFIG.get("disk_stats_ttl", 5.0) if max_age is None else max_age
+        with self.lock:
+            if self.result_at and time.monotonic() - self.result_at <= ttl:
+                return self.result
+            self._refresh_partitions()
+            self.result, self.result_at = self._probe(), time.monotonic()
+            self.probes += 1
+            return self.result
+
+    def _release(self, future: concurrent.futures.Future) -> None:
+        self.stuck.discard(future)
+        self.retired.discard(future)
+
+    def _probe(self) -> List[Dict]:
+        workers = CONFIG.get("disk_probe_workers", 8)
+        mounts = {part.mountpoint for part in self.partitions}
+        for mount in [m for m in self.pending if m not in mounts]:
+            del self.pending[mount]  # unmounted; a stuck probe stays counted until it returns
+        # Mounts with a probe still stuck from an earlier call are not resubmitted.
+        due = [part.mountpoint for part in self.partitions
+               if self.pending.get(part.mountpoint) is None or self.pending[part.mountpoint].done()]
+        skip = len(self.stuck) + len(self.retired) >= workers * DISK_PROBE_MAX_STUCK
+        if not skip and (self.pool is None or (self.stuck and len(due) > workers - len(self.stuck))):
+            if self.pool is not None:
+                self.pool.shutdown(wait=False)
+                self.retired = {f for f in self.retired | self.stuck if not f.done()}
+                self.stuck = set()
+            self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omnis-disk")
+        futures = []
+        if not skip:
+            for mount in due:
+                self.pending[mount] = self.pool.submit(psutil.disk_usage, mount)
+                futures.append(self.pending[mount])
+        concurrent.futures.wait(futures, timeout=CONFIG.get("disk_probe_timeout", 2.0))
+        for future in futures:
+            if not future.done():
+                self.stuck.add(future)
+                future.add_done_callback(self._release)
+
+        results = []
+        for part in self.partitions:
+            entry = {"device": part.device, "mountpoint": part.mountpoint, "fstype": part.fstype}
+            future = self.pending.get(part.mountpoint)
+            if future is None or not future.done():
+                entry["status"] = "skipped" if future is None else "hung"
+                results.append(entry)
+                continue
+            self.pending.pop(part.mountpoint, None)
+            try:
+                usage = future.result()
+            except Exception as e:
+                entry.update(status="error", error=str(e))
+            else:
+                entry.update(status="ok",
+                             total_gb=round(usage.total / (1024**3), 2),
+                             used_gb=round(usage.used / (1024**3), 2),
+                             free_gb=round(usage.free / (1024**3), 2),
+                             percent=usage.percent)
+            results.append(entry)
+        return results
+
+DISK_PROBER = DiskProber()
+
+class TelemetrySampler:
+    """Background thread that refreshes host telemetry and publishes a read-only snapshot.
+
+    CPU is measured as the delta between consecutive samples, so readers never sleep.
+    Disk usage is refreshed on its own, slower cadence.
+    """
+
+    def __init__(self):
+        self.snapshot: Optional[MappingProxyType] = None
+        self.ready = threading.Event()
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.errors = 0
+        self._disk: Tuple[Dict, ...] = ()
+        self._disk_at = 0.0
+        self._net_prev: Optional[Tuple[float, int, int]] = None
+        self._saved_at = time.monotonic()
+        self.io_samples: deque = deque()  # (monotonic, net counters, disk counters)
+        self.io_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="omnis-telemetry")
+                self.thread.start()
+
+    def get(self, timeout: float = 2.0) -> Optional[MappingProxyType]:
+        """Latest snapshot; only the very first caller waits for the initial sample."""
+        self.start()
+        self.ready.wait(timeout)
+        return self.snapshot
+
+    def _run(self) -> None:
+        HISTORY.load()
+        atexit.register(HISTORY.save)
+        psutil.cpu_percent(None)  # prime the delta
+        time.sleep(0.1)
+        while True:
+            try:
+                self.sample()
+                self.record(self.snapshot)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Telemetry sample failed: %s", e)
+            if time.monotonic() - self._saved_at >= CONFIG.get("history_snapshot_interval", 300):
+                self._saved_at = time.monotonic()
+                try:
+                    HISTORY.save()
+                except Exception as e:
+                    logger.error("Telemetry history snapshot failed: %s", e)
+            self.wakeup.wait(max(0.1, float(CONFIG.get("telemetry_interval", 2.0))))
+            self.wakeup.clear()
+
+    def _sample_disk(self) -> Tuple[Dict, ...]:
+        return tuple(MappingProxyType(part) for part in DISK_PROBER.get(max_age=0) if part["status"] == "ok")
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        if not self._disk_at or now - self._disk_at >= CONFIG.get("telemetry_disk_interval", 30):
+            self._disk, self._disk_at = self._sample_disk(), now
+        mem = psutil.virtual_memory()
+        battery = psutil.sensors_battery()
+        try:
+            net = psutil.net_io_counters(pernic=True)
+        except Exception:
+            net = {}
+        try:
+            disk_io = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            disk_io = {}
+        self._record_io(time.monotonic(), net, disk_io)
+        self.snapshot = MappingProxyType({
+            "monotonic": time.monotonic(),
+            "timestamp": datetime.now().isoformat(),
+            "cpu_percent": psutil.cpu_percent(None),
+            "memory_percent": mem.percent,
+            "available_gb": round(mem.available / (1024**3), 2),
+            "battery": MappingProxyType({
+                "percent": battery.percent,
+                "plugged": battery.power_plugged
+            }) if battery else "N/A",
+            "disk": self._disk,
+            "disk_age_s": round(now - self._disk_at, 3),
+            "network": MappingProxyType({iface: stat._asdict() for iface, stat in net.items()})
+        })
+        self.samples += 1
+        self.ready.set()
+
+    def _record_io(self, now: float, net: Dict, disk_io: Dict) -> None:
+        sample = (now, {k: v._asdict() for k, v in net.items()}, {k: v._asdict() for k, v in disk_io.items()})
+        horizon = now - CONFIG.get("io_rate_history", 300)
+        with self.io_lock:
+            self.io_samples.append(sample)
+            while len(self.io_samples) > 2 and self.io_samples[1][0] <= horizon:
+                self.io_samples.popleft()
+
+    def io_rates(self, kind: int, window: float) -> Optional[Tuple[float, float, Dict[str, Dict[str, float]]]]:
+        """Per-device counter deltas per second between the latest sample and the newest one at
+        least window seconds older (or the oldest kept). kind 1 is network, 2 is disk.
+        Returns (elapsed, age of latest sample, rates) or None until two samples taken at
+        different times exist."""
+        with self.io_lock:
+            if len(self.io_samples) < 2:
+                return None
+            latest = self.io_samples[-1]
+            base = self.io_samples[0]
+            for sample in itertools.islice(reversed(self.io_samples), 1, None):
+                elapsed = latest[0] - sample[0]
+                if elapsed > 0 and elapsed >= window:
+                    base = sample
+                    break
+        elapsed = latest[0] - base[0]
+        if elapsed <= 0:
+            return None
+        rates = {}
+        for name, now_counters in latest[kind].items():
+            before = base[kind].get(name)
+            if before is None:
+                continue
+            rates[name] = {field: max(0, value - before[field]) / elapsed
+                           for field, value in now_counters.items() if field in before}
+        return elapsed, time.monotonic() - latest[0], rates
+
+    def record(self, snap: MappingProxyType) -> None:
+        """Feed a snapshot into HISTORY; network totals become bytes/s between samples."""
+        values = {
+            "cpu_percent": snap["cpu_percent"],
+            "memory_percent": snap["memory_percent"],
+            "available_gb": snap["available_gb"]
+        }
+        if snap["battery"] != "N/A":
+            values["battery_percent"] = snap["battery"]["percent"]
+        for part in snap["disk"]:
+            values[f"disk_percent:{part['mountpoint']}"] = part["percent"]
+        sent = sum(stat["bytes_sent"] for stat in snap["network"].values())
+        recv = sum(stat["bytes_recv"] for stat in snap["network"].values())
+        if self._net_prev:
+            elapsed = snap["monotonic"] - self._net_prev[0]
+            if elapsed > 0:
+                values["net_sent_bps"] = max(0, sent - self._net_prev[1]) / elapsed
+                values["net_recv_bps"] = max(0, recv - self._net_prev[2]) / elapsed
+        self._net_prev = (snap["monotonic"], sent, recv)
+        HISTORY.record(values)
+
+    def age(self, snapshot: MappingProxyType) -> float:
+        return round(time.monotonic() - snapshot["monotonic"], 3)
+
+TELEMETRY = TelemetrySampler()
 
 # === CORE TOOLS ===
 
 @mcp.tool()
 def system_stats() -> Dict[str, Union[float, str, dict]]:
-    """System telemetry: CPU, RAM, Battery."""
+    """System telemetry: CPU, RAM, Battery. Served from the background sampler without blocking."""
     logger.debug("system_stats called")
-    cpu = psutil.cpu_percent(interval=0.1)
-    mem = psutil.virtual_memory()
-    battery = psutil.sensors_battery()
-    
+    snap = TELEMETRY.get()
+    if snap is None:
+        return {"error": "Telemetry not yet available"}
+    battery = snap["battery"]
     return {
-        "cpu_percent": cpu,
-        "memory_percent": mem.percent,
-        "available_gb": round(mem.available / (1024**3), 2),
-        "battery": {
-            "percent": battery.percent,
-            "plugged": battery.power_plugged
-        } if battery else "N/A",
-        "platform": platform.platform()
+        "cpu_percent": snap["cpu_percent"],
+        "memory_percent": snap["memory_percent"],
+        "available_gb": snap["available_gb"],
+        "battery": dict(battery) if battery != "N/A" else "N/A",
+        "platform": platform.platform(),
+        "sampled_at": snap["timestamp"],
+        "snapshot_age_s": TELEMETRY.age(snap)
     }
 
+def _shell_argv(command: str) -> List[str]:
+    """Platform shell argv for a one-shot command."""
+    if platform.system() == "Windows":
+        shell = "pwsh" if shutil.which("pwsh") else "cmd"
+        return [shell, "-Command", command] if shell == "pwsh" else ["cmd", "/c", command]
+    return [os.environ.get("SHELL", "/bin/bash"), "-c", command]
+
 @mcp.tool()
 def run_command(command: str) -> str:
     """Execute shell command with safety validation."""
-    logger.info(f"run_command: {command}")
+    logger.info("run_command: %s", command)
     
     if not _validate_command(command):
         _audit_log("run_command", f"BLOCKED: {command}", False)
         return "ERROR: Command blocked by policy"
     
-    _audit_log("run_command", command)
-    
-    system = platform.system()
-    if system == "Windows":
-        shell = "pwsh" if shutil.which("pwsh") else "cmd"
-        cmd = [shell, "-Command", command] if shell == "pwsh" else ["cmd", "/c", command]
-    else:
-        cmd = [os.environ.get("SHELL", "/bin/bash"), "-c", command]
-    
+    start = time.perf_counter()
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False, timeout=30)
+        result = subprocess.run(_shell_argv(command), capture_output=True, text=True,
+                                errors="replace", check=False, timeout=30)
+        _audit_log("run_command", f"{command} exit={result.returncode}", result.returncode == 0,
+                   _elapsed_ms(start))
         return f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}\nExit: {result.returncode}"
     except Exception as e:
+        _audit_log("run_command", f"{command}: {e}", False, _elapsed_ms(start))
         return f"Error: {e}"
 
+# --- Directory Listing ---
+
+LISTING_COLUMNS = ["name", "is_dir", "size", "mtime"]
+LISTING_CACHE_TTL = 60
+LISTING_CURSORS = 8
+_listing_cache: "OrderedDict[str, Tuple[float, List[tuple]]]" = OrderedDict()
+# Suspended unsorted walks: cursor id -> (last used, row generator, first row of the next page).
+_listing_cursors: "OrderedDict[str, Tuple[float, Iterator[tuple], tuple]]" = OrderedDict()
+_listing_lock = threading.Lock()
+
+def _park_listing_cursor(rows: Iterator[tuple], head: tuple) -> str:
+    """Keep a partly consumed walk for the next page; evicted walks are closed to free their fds."""
+    cursor_id = uuid.uuid4().hex[:16]
+    now = time.time()
+    with _listing_lock:
+        _listing_cursors[cursor_id] = (now, rows, head)
+        evicted = []
+        while len(_listing_cursors) > LISTING_CURSORS or \
+                now - next(iter(_listing_cursors.values()))[0] >= LISTING_CACHE_TTL:
+            evicted.append(_listing_cursors.popitem(last=False)[1][1])
+    for walk in evicted:
+        walk.close()
+    return cursor_id
+
+def _walk_entries(root: Path, max_depth: int):
+    """Yield (relative_name, DirEntry) depth-first using os.scandir; symlinked dirs are not followed."""
+    stack = [(str(root), "", 0)]
+    while stack:
+        directory, prefix, depth = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = prefix + entry.name
+                yield name, entry
+                if depth < max_depth and entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, name + "/", depth + 1))
+
+def _iter_listing(root: Path, max_depth: int, pattern: Optional[str], extensions: Optional[List[str]],
+                  include_dirs: bool):
+    exts = {e.lower() if e.startswith(".") else f".{e.lower()}" for e in extensions} if extensions else None
+    for name, entry in _walk_entries(root, max_depth):
+        try:
+            is_dir = entry.is_dir()
+            if is_dir and (not include_dirs or exts):
+                continue
+            if pattern and not fnmatch.fnmatch(entry.name, pattern):
+                continue
+            if exts and os.path.splitext(entry.name)[1].lower() not in exts:
+                continue
+            st = entry.stat()  # cached on the DirEntry after the first call
+        except OSError:
+            continue
+        yield (name, is_dir, None if is_dir else st.st_size, round(st.st_mtime, 3))
+
+def _sorted_listing(root: Path, max_depth: int, pattern: Optional[str], extensions: Optional[List[str]],
+                    include_dirs: bool, sort_by: str, descending: bool) -> List[tuple]:
+    rows = list(_iter_listing(root, max_depth, pattern, extensions, include_dirs))
+    column = LISTING_COLUMNS.index(sort_by)
+    rows.sort(key=lambda r: (r[column] is None, r[column] or 0) if column else r[0], reverse=descending)
+    return rows
+
 @mcp.tool()
-def list_directory(path: str = ".") -> List[Dict]:
-    """List directory contents with metadata."""
-    logger.debug(f"list_directory: {path}")
+def list_directory(path: str = ".", max_depth: int = 0, pattern: Optional[str] = None,
+                   extensions: Optional[List[str]] = None, include_dirs: bool = True,
+                   sort_by: Optional[str] = None, descending: bool = False, limit: int = 1000,
+                   page_token: Optional[str] = None, columnar: bool = False) -> Dict:
+    """List directory contents with metadata; recursive, filtered, sorted and paginated.
+
+    Returns {"path", "total", "offset", "entries" (or "columns" + "rows"), "next_page_token"}.
+    Unsorted listings are streamed from os.scandir and each token resumes the same suspended
+    walk, so "total" is null until the last page and a token is valid once, for
+    LISTING_CACHE_TTL seconds. Sorted listings are materialized once and cached for paging.
+    """
+    logger.debug("list_directory: %s", path)
     try:
-        results = []
-        with os.scandir(Path(path).resolve()) as entries:
-            for entry in entries:
-                results.append({
-                    "name": entry.name,
-                    "is_dir": entry.is_dir(),
-                    "size": entry.stat().st_size if not entry.is_dir() else None
-                })
-        return results
+        if sort_by is not None and sort_by not in LISTING_COLUMNS:
+            raise ValueError(f"sort_by must be one of {LISTING_COLUMNS}")
+        root = Path(path).resolve()
+        query = json.dumps([str(root), max_depth, pattern, extensions, include_dirs, sort_by, descending])
+        key = hashlib.sha1(query.encode()).hexdigest()[:16]
+        offset, cursor_id = 0, None
+        if page_token:
+            token = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+            if token["k"] != key:
+                raise ValueError("page_token does not match this query")
+            offset = token["o"]
+
+        limit = max(1, limit)
+        if sort_by is None:
+            if page_token:
+                with _listing_lock:
+                    cursor = _listing_cursors.pop(token.get("c", ""), None)
+                if cursor is None or time.time() - cursor[0] >= LISTING_CACHE_TTL:
+                    raise ValueError("page_token expired or already used; list again without it")
+                _, rows, head = cursor
+                page = [head] + list(itertools.islice(rows, limit))
+            else:
+                rows = _iter_listing(root, max(0, max_depth), pattern, extensions, include_dirs)
+                page = list(itertools.islice(rows, limit + 1))
+            more = len(page) > limit
+            if more:
+                cursor_id = _park_listing_cursor(rows, page[limit])
+            page = page[:limit]
+            total = None if more else offset + len(page)
+        else:
+            now = time.time()
+            with _listing_lock:
+                cached = _listing_cache.get(key)
+            if page_token and cached and now - cached[0] < LISTING_CACHE_TTL:
+                rows = cached[1]
+            else:
+                rows = _sorted_listing(root, max(0, max_depth), pattern, extensions, include_dirs,
+                                       sort_by, descending)
+                with _listing_lock:
+                    _listing_cache[key] = (now, rows)
+                    _listing_cache.move_to_end(key)
+                    while len(_listing_cache) > 8:
+                        _listing_cache.popitem(last=False)
+            page = rows[offset:offset + limit]
+            total = len(rows)
+            more = offset + len(page) < total
+
+        end = offset + len(page)
+        result = {"path": str(root), "total": total, "offset": offset}
+        if columnar:
+            result["columns"] = LISTING_COLUMNS
+            result["rows"] = [list(r) for r in page]
+        else:
+            result["entries"] = [dict(zip(LISTING_COLUMNS, r)) for r in page]
+        result["next_page_token"] = base64.urlsafe_b64encode(
+            json.dumps({"k": key, "o": end, "c": cursor_id}).encode()
+        ).decode() if more else None
+        return result
     except Exception as e:
-        return [{"error": str(e)}]
+        return {"error": str(e)}
+
+# --- Ranged File Access ---
+
+LINE_INDEX_BLOCK = 64 * 1024
+LINE_INDEX_CACHE_SIZE = 32
+
+class LineIndex:
+    """Sparse line-offset index: newline count before every LINE_INDEX_BLOCK bytes."""
+
+    def __init__(self, path: Path, stat: os.stat_result):
+        self.key = (stat.st_mtime_ns, stat.st_size)
+        self.offsets: List[int] = []
+        self.lines_before: List[int] = []
+        lines = 0
+        last = b""
+        with open(path, "rb") as f:
+            pos = 0
+            while chunk := f.read(LINE_INDEX_BLOCK * 16):
+                for start in range(0, len(chunk), LINE_INDEX_BLOCK):
+                    self.offsets.append(pos + start)
+                    self.lines_before.append(lines)
+                    lines += chunk.count(b"\n", start, start + LINE_INDEX_BLOCK)
+                pos += len(chunk)
+                last = chunk[-1:]
+        self.newlines = lines
+        self.size = pos
+        self.line_count = lines + (1 if last not in (b"", b"\n") else 0)
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset of the start of zero-based line, or EOF if past the end."""
+        if line <= 0:
+            return 0
+        if line > self.newlines:
+            return self.size
+        # Last block that starts with fewer than `line` newlines before it.
+        i = bisect.bisect_left(self.lines_before, line) - 1
+        start = self.offsets[i]
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.size
+        need = line - self.lines_before[i]
+        data = mm[start:end]
+        parts = data.split(b"\n", need)
+        return start + len(data) - len(parts[-1])
+
+_line_indexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+_line_index_lock = threading.Lock()
+
+def _get_line_index(path: Path) -> LineIndex:
+    """Cached line index for path, rebuilt when mtime or size changes."""
+    key = str(path.resolve())
+    stat = path.stat()
+    with _line_index_lock:
+        index = _line_indexes.get(key)
+        if index and index.key == (stat.st_mtime_ns, stat.st_size):
+            _line_indexes.move_to_end(key)
+            return index
+    index = LineIndex(path, stat)
+    with _line_index_lock:
+        _line_indexes[key] = index
+        while len(_line_indexes) > LINE_INDEX_CACHE_SIZE:
+            _line_indexes.popitem(last=False)
+    return index
+
+def _read_range(path: Path, offset: int = 0, length: Optional[int] = None,
+                start_line: Optional[int] = None, end_line: Optional[int] = None) -> bytes:
+    """Read a byte or 1-based inclusive line range through mmap."""
+    size = path.stat().st_size
+    if size == 0:
+        return b""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start_line is not None or end_line is not None:
+            index = _get_line_index(path)
+            begin = index.line_start(mm, max(1, start_line or 1) - 1)
+            end = index.line_start(mm, end_line) if end_line is not None else size
+            return mm[begin:end]
+        begin = min(max(0, offset), size)
+        return mm[begin:size if length is None else min(size, begin + max(0, length))]
+
+def _sniff_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    if b"\x00" in sample:
+        return "binary"
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8.
+        return "utf-8" if e.start >= len(sample) - 3 else "unknown"
+
+@mcp.tool()
+def file_info(path: str, force: bool = False) -> Dict:
+    """File size, line count (exact if indexed, else estimated) and encoding."""
+    logger.debug("file_info: %s", path)
+    try:
+        _validate_access(path, force)
+        p = Path(path)
+        stat = p.stat()
+        with open(p, "rb") as f:
+            sample = f.read(LINE_INDEX_BLOCK)
+        key = str(p.resolve())
+        index = _line_indexes.get(key)
+        if index and index.key == (stat.st_mtime_ns, stat.st_size):
+            lines, exact = index.line_count, True
+        elif len(sample) == stat.st_size:
+            lines, exact = sample.count(b"\n") + (1 if sample and not sample.endswith(b"\n") else 0), True
+        else:
+            lines, exact = int(stat.st_size * max(1, sample.count(b"\n")) / len(sample)), False
+        return {
+            "path": key,
+            "size": stat.st_size,
+            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "line_count": lines,
+            "line_count_exact": exact,
+            "encoding": _sniff_encoding(sample)
+        }
+    except Exception as e:
+        return {"error": str(e)}
 
 @mcp.tool()
-def read_file(path: str, force: bool = False) -> str:
-    """Read file with safety check."""
-    logger.debug(f"read_file: {path}")
+def read_file(path: str, force: bool = False, offset: int = 0, length: Optional[int] = None,
+              start_line: Optional[int] = None, end_line: Optional[int] = None,
+              binary: bool = False) -> str:
+    """Read file with safety check. Supports byte ranges, 1-based line ranges and base64 output."""
+    logger.debug("read_file: %s", path)
     try:
         _validate_access(path, force)
-        return Path(path).read_text(encoding='utf-8')
+        p = Path(path)
+        ranged = offset or length is not None or start_line is not None or end_line is not None
+        if not ranged and not binary:
+            return p.read_text(encoding='utf-8')
+        data = _read_range(p, offset, length, start_line, end_line)
+        if binary:
+            return base64.b64encode(data).decode("ascii")
+        return data.decode("utf-8", errors="replace")
     except Exception as e:
         return f"Error: {e}"
 
 @mcp.tool()
 def write_file(path: str, content: str, force: bool = False) -> str:
     """Write file with rollback support."""
-    logger.info(f"write_file: {path}")
+    logger.info("write_file: %s", path)
+    start = time.perf_counter()
     try:
         _validate_access(path, force)
         p = Path(path)
         _create_rollback(p)
         p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(content, encoding='utf-8')
-        _audit_log("write_file", str(p))
+        with _atomic_open(p, "w", encoding="utf-8") as f:
+            f.write(content)
+        _audit_log("write_file", str(p), duration_ms=_elapsed_ms(start))
         return f"Written to {p}"
     except Exception as e:
-        _audit_log("write_file", f"{path}: {e}", False)
+        _audit_log("write_file", f"{path}: {e}", False, _elapsed_ms(start))
+        return f"Error: {e}"
+
+# --- Patching ---
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+def _parse_unified_diff(diff: str) -> List[Dict]:
+    """Parse a single-file unified diff into hunks of (tag, text, no_eol) lines."""
+    hunks: List[Dict] = []
+    for line in diff.splitlines():
+        match = _HUNK_RE.match(line)
+        if match:
+            old_start, old_len = int(match.group(1)), int(match.group(2) or 1)
+            hunks.append({"old_start": old_start, "old_len": old_len, "lines": []})
+        elif not hunks:
+            continue  # ---/+++/diff headers
+        elif line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line.
+            if hunks[-1]["lines"]:
+                tag, text, _ = hunks[-1]["lines"][-1]
+                hunks[-1]["lines"][-1] = (tag, text, True)
+        elif line[:1] in (" ", "-", "+") or line == "":
+            hunks[-1]["lines"].append((line[:1] or " ", line[1:].encode("utf-8"), False))
+        else:
+            raise ValueError(f"Malformed diff line: {line!r}")
+    if not hunks:
+        raise ValueError("No hunks found in diff")
+    return hunks
+
+def _apply_unified_diff(src, out, hunks: List[Dict]) -> None:
+    """Stream src to out, applying hunks in order with exact context matching."""
+    first = src.readline()
+    newline = b"\r\n" if first.endswith(b"\r\n") else b"\n"
+    src.seek(0)
+    lineno = 1
+    for hunk in hunks:
+        start = hunk["old_start"] if hunk["old_len"] else hunk["old_start"] + 1
+        if start < lineno:
+            raise ValueError(f"Overlapping or unordered hunk at line {hunk['old_start']}")
+        while lineno < start:
+            line = src.readline()
+            if not line:
+                raise ValueError(f"Hunk starts past end of file (line {start})")
+            out.write(line)
+            lineno += 1
+        for tag, text, no_eol in hunk["lines"]:
+            if tag == "+":
+                out.write(text if no_eol else text + newline)
+                continue
+            line = src.readline()
+            if line.rstrip(b"\r\n") != text:
+                raise ValueError(f"Hunk context mismatch at line {lineno}")
+            lineno += 1
+            if tag == " ":
+                out.write(line)
+    shutil.copyfileobj(src, out, 1024 * 1024)
+
+def _apply_edits(path: Path, out, edits: List[Dict]) -> None:
+    """Apply search/replace edits located in the original content via mmap."""
+    if path.stat().st_size == 0:
+        raise ValueError("Cannot apply search/replace edits to an empty file")
+    spans = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for edit in edits:
+            search = edit["search"].encode("utf-8")
+            replace = edit.get("replace", "").encode("utf-8")
+            expected = edit.get("count", 1)
+            found, pos = 0, mm.find(search) if search else -1
+            while pos != -1:
+                spans.append((pos, pos + len(search), replace))
+                found += 1
+                pos = mm.find(search, pos + len(search))
+            if found == 0 or (expected and found != expected):
+                raise ValueError(f"Search text matched {found} times, expected {expected or 'at least 1'}: {edit['search'][:60]!r}")
+        spans.sort()
+        pos = 0
+        for start, end, replace in spans:
+            if start < pos:
+                raise ValueError("Edits overlap")
+            out.write(mm[pos:start])
+            out.write(replace)
+            pos = end
+        out.write(mm[pos:])
+
+@mcp.tool()
+def patch_file(path: str, diff: Optional[str] = None, edits: Optional[List[Dict]] = None,
+               force: bool = False) -> str:
+    """Apply a unified diff or search/replace edits ({"search", "replace", "count"}) atomically."""
+    logger.info("patch_file: %s", path)
+    start = time.perf_counter()
+    try:
+        _validate_access(path, force)
+        if (diff is None) == (edits is None):
+            raise ValueError("Provide exactly one of diff or edits")
+        p = Path(path)
+        if not p.is_file():
+            raise FileNotFoundError(f"No such file: {p}")
+        with _atomic_open(p) as out:
+            if diff is not None:
+                hunks = _parse_unified_diff(diff)
+                with open(p, "rb") as src:
+                    _apply_unified_diff(src, out, hunks)
+                summary = f"{len(hunks)} hunks"
+            else:
+                _apply_edits(p, out, edits)
+                summary = f"{len(edits)} edits"
+            _create_rollback(p)
+        _audit_log("patch_file", f"{p}: {summary}", duration_ms=_elapsed_ms(start))
+        return f"Patched {p} ({summary})"
+    except Exception as e:
+        _audit_log("patch_file", f"{path}: {e}", False, _elapsed_ms(start))
+        return f"Error: {e}"
+
+@mcp.tool()
+def list_rollbacks(path: str, force: bool = False) -> List[Dict]:
+    """List stored rollback versions of a file, newest first."""
+    try:
+        _validate_access(path, force)
+        return ROLLBACK_STORE.versions(Path(path))
+    except Exception as e:
+        return [{"error": str(e)}]
+
+@mcp.tool()
+def restore_rollback(path: str, version: int, force: bool = False) -> str:
+    """Restore a file to a stored rollback version (the current content is snapshotted first)."""
+    logger.info("restore_rollback: %s@%s", path, version)
+    start = time.perf_counter()
+    try:
+        _validate_access(path, force)
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with _atomic_open(p) as f:
+            for chunk in ROLLBACK_STORE.open_version(p, version):
+                f.write(chunk)
+            # Snapshot after staging: it may evict the version being restored.
+            _create_rollback(p)
+        _audit_log("restore_rollback", f"{p}@{version}", duration_ms=_elapsed_ms(start))
+        return f"Restored {p} to version {version}"
+    except Exception as e:
+        _audit_log("restore_rollback", f"{path}@{version}: {e}", False, _elapsed_ms(start))
         return f"Error: {e}"
 
 @mcp.tool()
@@ -260,28 +1591,1307 @@ def set_clipboard(content: str) -> str:
     except Exception as e:
         return f"Error: {e}"
 
-# === PROCESS MANAGEMENT ===
+# === PERSISTENT SHELL SESSIONS ===
+
+SHELL_SENTINEL = "__OMNIS_DONE__"
+
+def _session_shell_argv() -> Optional[List[str]]:
+    """Shell argv that reads commands from stdin, or None if unsupported."""
+    if platform.system() == "Windows":
+        pwsh = shutil.which("pwsh") or shutil.which("powershell")
+        return [pwsh, "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"] if pwsh else None
+    return [os.environ.get("SHELL", "/bin/bash")]
+
+class ShellSession:
+    """Long-lived shell process driven by a sentinel-delimited protocol."""
+
+    def __init__(self, argv: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.is_pwsh = "pwsh" in Path(argv[0]).name.lower() or "powershell" in Path(argv[0]).name.lower()
+        self.proc = subprocess.Popen(
+            argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1
+        )
+        self.lines: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.created = self.last_used = time.time()
+        for name, stream in (("stdout", self.proc.stdout), ("stderr", self.proc.stderr)):
+            threading.Thread(target=self._pump, args=(name, stream), daemon=True).start()
+
+    def _pump(self, name: str, stream) -> None:
+        for line in iter(stream.readline, ""):
+            self.lines.put((name, line))
+        self.lines.put((name, None))
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _script(self, command: str, token: str) -> str:
+        if self.is_pwsh:
+            return (f"{command}\n"
+                    f"Write-Output \"{token} $LASTEXITCODE\"; [Console]::Error.WriteLine('{token}')\n")
+        # Braces keep cd/export in this shell; stdin is detached so commands cannot eat the protocol.
+        return (f"{{\n{command}\n}} </dev/null\n"
+                f"printf '%s %d\\n' '{token}' $?; printf '%s\\n' '{token}' >&2\n")
+
+    def execute(self, command: str, timeout: float = 30) -> Tuple[str, str, int]:
+        """Run command in the session; returns (stdout, stderr, exit_code)."""
+        token = f"{SHELL_SENTINEL}{uuid.uuid4().hex}"
+        out: Dict[str, List[str]] = {"stdout": [], "stderr": []}
+        pending = {"stdout", "stderr"}
+        code = -1
+        deadline = time.monotonic() + timeout
+        self.last_used = time.time()
+        self.proc.stdin.write(self._script(command, token))
+        self.proc.stdin.flush()
+        while pending:
+            try:
+                name, line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"Command timed out after {timeout}s")
+            if line is None:
+                raise RuntimeError("Shell session exited")
+            idx = line.find(token)
+            if idx == -1:
+                out[name].append(line)
+                continue
+            out[name].append(line[:idx])
+            pending.discard(name)
+            if name == "stdout":
+                try:
+                    code = int(line[idx + len(token):].split()[0])
+                except (IndexError, ValueError):
+                    code = 0
+        self.last_used = time.time()
+        return "".join(out["stdout"]), "".join(out["stderr"]), code
+
+    def close(self, kill: bool = False) -> None:
+        """End the shell. kill=True, or a shell that ignores EOF, takes down its whole process tree."""
+        if not kill:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+                return
+            except Exception:
+                pass
+        _kill_tree(self.proc.pid)
+        try:
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=5)  # reap it, or it lingers as a zombie
+        except subprocess.TimeoutExpired:
+            logger.warning("Shell %s did not exit after kill", self.id)
+
+SHELL_SESSIONS: Dict[str, ShellSession] = {}
+SHELL_POOL: List[ShellSession] = []
+_shell_lock = threading.Lock()
+_shell_reaper_started = False
+
+def _spawn_shell() -> ShellSession:
+    argv = _session_shell_argv()
+    if not argv:
+        raise RuntimeError("Persistent shells require a POSIX shell or PowerShell")
+    return ShellSession(argv)
+
+def _warm_shell_pool() -> None:
+    """Top up the pool of idle, pre-started shells."""
+    with _shell_lock:
+        SHELL_POOL[:] = [s for s in SHELL_POOL if s.alive()]
+        missing = CONFIG.get("shell_pool_size", 2) - len(SHELL_POOL)
+    for _ in range(max(0, missing)):
+        try:
+            shell = _spawn_shell()
+        except Exception as e:
+            logger.error("Shell pool warm-up failed: %s", e)
+            return
+        with _shell_lock:
+            full = len(SHELL_POOL) >= CONFIG.get("shell_pool_size", 2)
+            if not full:
+                SHELL_POOL.append(shell)
+        if full:  # another warm-up filled the pool meanwhile
+            shell.close()
+            return
+
+def _shell_reaper() -> None:
+    while True:
+        time.sleep(30)
+        idle_limit = CONFIG.get("shell_idle_timeout", 600)
+        now = time.time()
+        with _shell_lock:
+            stale = [sid for sid, s in SHELL_SESSIONS.items()
+                     if not s.alive() or (not s.lock.locked() and now - s.last_used > idle_limit)]
+            reaped = [SHELL_SESSIONS.pop(sid) for sid in stale]
+        for shell in reaped:
+            logger.info("Reaping idle shell session %s", shell.id)
+            shell.close()
+        _warm_shell_pool()
+
+def _acquire_shell() -> ShellSession:
+    global _shell_reaper_started
+    with _shell_lock:
+        if len(SHELL_SESSIONS) >= CONFIG.get("shell_max_sessions", 16):
+            raise RuntimeError("Shell session limit reached")
+        shell = None
+        while SHELL_POOL and shell is None:
+            candidate = SHELL_POOL.pop()
+            shell = candidate if candidate.alive() else None
+        if not _shell_reaper_started:
+            _shell_reaper_started = True
+            threading.Thread(target=_shell_reaper, daemon=True).start()
+    if shell is None:
+        shell = _spawn_shell()
+    shell.last_used = time.time()  # idle time in the pool does not count against the session
+    threading.Thread(target=_warm_shell_pool, daemon=True).start()
+    return shell
 
 @mcp.tool()
-def list_processes() -> List[Dict]:
-    """List all processes with stats."""
-    logger.debug("list_processes called")
+def open_shell(cwd: Optional[str] = None, force: bool = False) -> Dict:
+    """Open a persistent shell session that keeps cwd/env between commands."""
+    logger.info("open_shell: cwd=%s", cwd)
+    start = time.perf_counter()
+    try:
+        if cwd:
+            _validate_access(cwd, force)
+        shell = _acquire_shell()
+        if cwd:
+            try:
+                target = shlex.quote(str(Path(cwd).resolve())) if not shell.is_pwsh else f"'{Path(cwd).resolve()}'"
+                _, err, code = shell.execute(f"cd {target}", timeout=10)
+                if code != 0:
+                    raise RuntimeError(f"cd failed: {err.strip()}")
+            except Exception:
+                shell.close(kill=True)
+                raise
+        with _shell_lock:
+            SHELL_SESSIONS[shell.id] = shell
+        _audit_log("open_shell", f"{shell.id} pid={shell.proc.pid} cwd={cwd}", duration_ms=_elapsed_ms(start))
+        return {"session_id": shell.id, "pid": shell.proc.pid}
+    except Exception as e:
+        _audit_log("open_shell", f"{cwd}: {e}", False, _elapsed_ms(start))
+        return {"error": str(e)}
+
+@mcp.tool()
+def shell_exec(session_id: str, command: str, timeout: int = 30) -> str:
+    """Execute a command inside a persistent shell session."""
+    logger.info("shell_exec [%s]: %s", session_id, command)
+
+    if not _validate_command(command):
+        _audit_log("shell_exec", f"BLOCKED [{session_id}]: {command}", False)
+        return "ERROR: Command blocked by policy"
+
+    shell = SHELL_SESSIONS.get(session_id)
+    if not shell:
+        return f"Error: Unknown shell session '{session_id}'"
+    if not shell.lock.acquire(timeout=timeout):
+        return f"Error: Shell session '{session_id}' is busy"
+
+    start = time.perf_counter()
+    try:
+        stdout, stderr, code = shell.execute(command, timeout)
+        _audit_log("shell_exec", f"[{session_id}] {command} exit={code}", code == 0, _elapsed_ms(start))
+        return f"STDOUT:\n{stdout}\nSTDERR:\n{stderr}\nExit: {code}"
+    except Exception as e:
+        _audit_log("shell_exec", f"[{session_id}] {command}: {e}", False, _elapsed_ms(start))
+        # A timed-out or crashed session has an unknown protocol state; drop it.
+        with _shell_lock:
+            SHELL_SESSIONS.pop(session_id, None)
+        shell.close(kill=True)
+        return f"Error: {e} (session closed)"
+    finally:
+        shell.lock.release()
+
+@mcp.tool()
+def close_shell(session_id: str) -> str:
+    """Close a persistent shell session."""
+    with _shell_lock:
+        shell = SHELL_SESSIONS.pop(session_id, None)
+    if not shell:
+        return f"Error: Unknown shell session '{session_id}'"
+    shell.close()
+    _audit_log("close_shell", session_id)
+    return f"Closed shell session {session_id}"
+
+# === STREAMING COMMAND OUTPUT ===
+
+OUTPUT_DIR = LOG_DIR / "command_output"
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+_HANDLE_RE = re.compile(r"[0-9a-f]{32}")
+
+class OutputSink:
+    """Keeps output in memory up to a byte budget, then spills it to disk."""
+
+    def __init__(self, handle: str, stream: str, budget: int):
+        self.path = OUTPUT_DIR / f"{handle}.{stream}"
+        self.budget = budget
+        self.buffer = bytearray()
+        self.size = 0
+        self.file = None
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.file is None and len(self.buffer) + len(chunk) <= self.budget:
+            self.buffer.extend(chunk)
+            return
+        if self.file is None:
+            self.file = open(self.path, "wb")
+            self.file.write(self.buffer)
+            self.buffer.extend(chunk[:self.budget - len(self.buffer)])
+        self.file.write(chunk)
+
+    @property
+    def spilled(self) -> bool:
+        return self.file is not None
+
+    def head(self) -> str:
+        return bytes(self.buffer).decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+
+def _prune_output_dir() -> None:
+    """Keep only the newest spilled output files."""
+    keep = CONFIG.get("output_spill_retention", 50) * 2
+    files = sorted(OUTPUT_DIR.iterdir(), key=lambda f: f.stat().st_mtime, reverse=True)
+    for old in files[keep:]:
+        try:
+            old.unlink(missing_ok=True)
+        except OSError:  # still open by a reader (Windows); retry on the next prune
+            pass
+
+def _kill_tree(pid: int) -> None:
+    """Kill a process and all of its descendants."""
+    try:
+        parent = psutil.Process(pid)
+        family = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in family:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+async def _pump_stream(reader: asyncio.StreamReader, sink: OutputSink, name: str,
+                       ctx: Optional[Context], progress: Dict[str, int]) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        sink.write(chunk)
+        progress["bytes"] += len(chunk)
+        if ctx:
+            await ctx.report_progress(progress["bytes"], None, f"[{name}] {decoder.decode(chunk)}")
+
+@mcp.tool()
+async def stream_command(command: str, timeout: int = 30, max_bytes: Optional[int] = None,
+                         ctx: Optional[Context] = None) -> Dict:
+    """Execute shell command, streaming output chunks as progress and spilling large output to disk."""
+    logger.info("stream_command: %s", command)
+
+    if not _validate_command(command):
+        _audit_log("stream_command", f"BLOCKED: {command}", False)
+        return {"error": "Command blocked by policy"}
+
+    start = time.perf_counter()
+    handle = uuid.uuid4().hex
+    budget = max_bytes or CONFIG.get("output_spill_bytes", 1024 * 1024)
+    sinks = {name: OutputSink(handle, name, budget) for name in ("stdout", "stderr")}
+    progress = {"bytes": 0}
+    timed_out = False
+    try:
+        argv = _shell_argv(command)
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        pumps = asyncio.gather(
+            _pump_stream(proc.stdout, sinks["stdout"], "stdout", ctx, progress),
+            _pump_stream(proc.stderr, sinks["stderr"], "stderr", ctx, progress)
+        )
+        try:
+            await asyncio.wait_for(asyncio.shield(pumps), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            _kill_tree(proc.pid)
+            try:
+                await asyncio.wait_for(pumps, 5)
+            except asyncio.TimeoutError:
+                pass
+        exit_code = await proc.wait()
+    except Exception as e:
+        _audit_log("stream_command", f"{command}: {e}", False, _elapsed_ms(start))
+        return {"error": str(e)}
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    _audit_log("stream_command", f"{command} exit={exit_code} timed_out={timed_out}",
+               exit_code == 0 and not timed_out, _elapsed_ms(start))
+
+    result = {"exit_code": exit_code, "timed_out": timed_out}
+    for name, sink in sinks.items():
+        result[name] = sink.head()
+        result[f"{name}_bytes"] = sink.size
+    if any(sink.spilled for sink in sinks.values()):
+        result["truncated"] = True
+        result["handle"] = handle
+        _prune_output_dir()
+    return result
+
+@mcp.tool()
+def read_command_output(handle: str, stream: str = "stdout", offset: int = 0,
+                        limit: int = 65536, binary: bool = False) -> Dict:
+    """Page through spilled command output by byte offset."""
+    if not _HANDLE_RE.fullmatch(handle) or stream not in ("stdout", "stderr"):
+        return {"error": "Invalid handle or stream"}
+    try:
+        return _read_output_page(OUTPUT_DIR / f"{handle}.{stream}", offset, limit, binary)
+    except FileNotFoundError:
+        return {"error": f"No {stream} output for handle {handle}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+def _read_output_page(path: Path, offset: int, limit: int, binary: bool = False) -> Dict:
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        f.seek(max(0, offset))
+        data = f.read(max(0, limit))
+    next_offset = max(0, offset) + len(data)
+    return {
+        "data": base64.b64encode(data).decode("ascii") if binary else data.decode("utf-8", errors="replace"),
+        "encoding": "base64" if binary else "utf-8",
+        "offset": offset,
+        "next_offset": next_offset,
+        "size": size,
+        "eof": next_offset >= size
+    }
+
+# === ASYNC JOBS ===
+
+JOB_DIR = LOG_DIR / "jobs"  # separate from OUTPUT_DIR so spill pruning never touches job output
+JOB_DIR.mkdir(parents=True, exist_ok=True)
+
+class Job:
+    """A background shell command whose output is written to JOB_DIR."""
+
+    def __init__(self, command: str, timeout: int):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.timeout = timeout
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.exit_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.proc = None
+        self.future = None
+        self.paths = {name: JOB_DIR / f"{self.id}.{name}" for name in ("stdout", "stderr")}
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ("queued", "running")
+
+    def summary(self) -> Dict:
+        end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "pid": self.proc.pid if self.proc else None,
+            "submitted": datetime.fromtimestamp(self.submitted).isoformat(),
+            "runtime_s": round(end - self.started, 3) if self.started else None,
+            "output_bytes": {name: p.stat().st_size if p.exists() else 0 for name, p in self.paths.items()},
+            "error": self.error
+        }
+
+JOBS: Dict[str, Job] = {}
+_jobs_lock = threading.Lock()
+_job_loop: Optional[asyncio.AbstractEventLoop] = None
+_job_slots: Optional[asyncio.Semaphore] = None
+
+def _get_job_loop() -> asyncio.AbstractEventLoop:
+    """Lazily start the event loop thread that owns all job subprocesses."""
+    global _job_loop, _job_slots
+    with _jobs_lock:
+        if _job_loop is None:
+            _job_loop = asyncio.new_event_loop()
+            _job_slots = asyncio.Semaphore(CONFIG.get("job_max_concurrency", 4))
+            threading.Thread(target=_job_loop.run_forever, daemon=True, name="omnis-jobs").start()
+    return _job_loop
+
+async def _run_job(job: Job) -> None:
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+        async with _job_slots:
+            job.status = "running"
+            job.started = time.time()
+            with open(job.paths["stdout"], "wb") as out, open(job.paths["stderr"], "wb") as err:
+                job.proc = await asyncio.create_subprocess_exec(
+                    *_shell_argv(job.command), stdin=asyncio.subprocess.DEVNULL, stdout=out, stderr=err
+                )
             try:
-                processes.append(proc.info)
-            except:
+                job.exit_code = await asyncio.wait_for(job.proc.wait(), job.timeout)
+                job.status = "succeeded" if job.exit_code == 0 else "failed"
+            except asyncio.TimeoutError:
+                _kill_tree(job.proc.pid)
+                job.exit_code = await job.proc.wait()
+                job.status = "timed_out"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        if job.proc:
+            _kill_tree(job.proc.pid)
+            job.exit_code = await job.proc.wait()
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished = time.time()
+        logger.info("Job %s finished: %s", job.id, job.status)
+        _audit_log("job_finished", f"{job.id}: {job.status} exit={job.exit_code}", job.status == "succeeded",
+                   round((job.finished - (job.started or job.submitted)) * 1000, 2))
+        _prune_jobs()
+
+def _prune_jobs() -> None:
+    """Drop the oldest finished job records beyond the retention limit."""
+    with _jobs_lock:
+        finished = [j for j in JOBS.values() if j.done]
+        excess = len(finished) - CONFIG.get("job_retention", 100)
+        evicted = [JOBS.pop(j.id) for j in finished[:max(0, excess)]]
+    for job in evicted:
+        for path in job.paths.values():
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
                 pass
-        return sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:50]
+
+@mcp.tool()
+def submit_job(command: str, timeout: Optional[int] = None) -> Dict:
+    """Run a shell command in the background and return a job id to poll."""
+    logger.info("submit_job: %s", command)
+
+    if not _validate_command(command):
+        _audit_log("submit_job", f"BLOCKED: {command}", False)
+        return {"error": "Command blocked by policy"}
+
+    job = Job(command, timeout or CONFIG.get("job_default_timeout", 3600))
+    loop = _get_job_loop()
+    # Publish the job only once it has a future, so cancel_job never sees it half-built.
+    job.future = asyncio.run_coroutine_threadsafe(_run_job(job), loop)
+    with _jobs_lock:
+        JOBS[job.id] = job
+    _audit_log("submit_job", f"{job.id}: {command}")
+    return {"job_id": job.id, "status": job.status}
+
+@mcp.tool()
+def job_status(job_id: str) -> Dict:
+    """Status, exit code and output sizes of a background job."""
+    job = JOBS.get(job_id)
+    return job.summary() if job else {"error": f"Unknown job '{job_id}'"}
+
+@mcp.tool()
+def job_output(job_id: str, stream: str = "stdout", offset: int = 0,
+               limit: int = 65536, binary: bool = False) -> Dict:
+    """Page through a job's output by byte offset; safe to poll while it runs."""
+    job = JOBS.get(job_id)
+    if not job:
+        return {"error": f"Unknown job '{job_id}'"}
+    if stream not in job.paths:
+        return {"error": "stream must be 'stdout' or 'stderr'"}
+    if not job.paths[stream].exists():
+        return {"data": "", "offset": offset, "next_offset": offset, "size": 0, "eof": job.done, "status": job.status}
+    try:
+        page = _read_output_page(job.paths[stream], offset, limit, binary)
+    except Exception as e:
+        return {"error": str(e)}
+    # More output may still arrive while the job runs.
+    page["eof"] = page["eof"] and job.done
+    page["status"] = job.status
+    return page
+
+@mcp.tool()
+def cancel_job(job_id: str) -> str:
+    """Cancel a queued or running job, killing its process tree."""
+    job = JOBS.get(job_id)
+    if not job:
+        return f"Error: Unknown job '{job_id}'"
+    if job.done:
+        return f"Job {job_id} already {job.status}"
+    job.future.cancel()
+    _audit_log("cancel_job", job_id)
+    return f"Cancellation requested for job {job_id}"
+
+@mcp.tool()
+def list_jobs(status: Optional[str] = None) -> List[Dict]:
+    """List retained jobs, optionally filtered by status."""
+    with _jobs_lock:
+        jobs = list(JOBS.values())
+    return [j.summary() for j in jobs if status is None or j.status == status]
+
+# === CONTENT SEARCH ===
+
+class IgnoreRules:
+    """Accumulated .gitignore rules for a directory and its ancestors."""
+
+    def __init__(self, rules: tuple = ()):
+        self.rules = rules
+
+    def load(self, directory: str, prefix: str) -> "IgnoreRules":
+        """Rules for a child directory: inherit ours and add its .gitignore, if any."""
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+        rules = list(self.rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            line = line.lstrip("!")
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line.startswith("**/"):
+                line = line[3:]
+            anchored = "/" in line
+            rules.append((prefix, line.lstrip("/"), negate, dir_only, anchored))
+        return IgnoreRules(tuple(rules))
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        for base, pattern, negate, dir_only, anchored in self.rules:
+            if (dir_only and not is_dir) or not rel.startswith(base):
+                continue
+            sub = rel[len(base):]
+            if fnmatch.fnmatchcase(sub if anchored else sub.rsplit("/", 1)[-1], pattern):
+                result = not negate
+        return result
+
+def _glob_any(rel: str, name: str, patterns: Optional[List[str]]) -> bool:
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel, p) for p in patterns or ())
+
+def _iter_search_files(root: Path, include: Optional[List[str]], exclude: Optional[List[str]],
+                       use_gitignore: bool):
+    """Yield (path, relative_name) for candidate files; symlinks are never followed out of root."""
+    base = IgnoreRules().load(str(root), "") if use_gitignore else None
+    stack = [(str(root), "", base)]
+    while stack:
+        directory, prefix, rules = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name == ".git" or (rules and rules.ignored(rel, True)) or _glob_any(rel, entry.name, exclude):
+                            continue
+                        stack.append((entry.path, rel + "/", rules.load(entry.path, rel + "/") if rules else None))
+                    elif entry.is_file(follow_symlinks=False):
+                        if rules and rules.ignored(rel, False):
+                            continue
+                        if include and not _glob_any(rel, entry.name, include):
+                            continue
+                        if not _glob_any(rel, entry.name, exclude):
+                            yield entry.path, rel
+                except OSError:
+                    continue
+
+def _decode_line(raw: bytes) -> str:
+    return raw.rstrip(b"\r").decode("utf-8", errors="replace")[:500]
+
+def _search_file(path: str, rel: str, regex: "re.Pattern", context: int, limit: int) -> Tuple[str, List[Dict]]:
+    """Regex search over an mmap of one file; one match per line, binaries skipped."""
+    matches: List[Dict] = []
+    try:
+        size = os.path.getsize(path)
+        if size == 0 or size > CONFIG.get("search_max_file_bytes", 100 * 1024 * 1024):
+            return rel, matches
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b"\x00", 0, 8192) != -1:
+                return rel, matches
+            line_no, counted, next_line = 1, 0, 0
+            for m in regex.finditer(mm):
+                start = m.start()
+                if start < next_line:
+                    continue
+                line_no += mm[counted:start].count(b"\n")
+                counted = start
+                line_start = mm.rfind(b"\n", 0, start) + 1
+                line_end = mm.find(b"\n", start)
+                line_end = size if line_end == -1 else line_end
+                match = {"line": line_no, "text": _decode_line(mm[line_start:line_end])}
+                if context:
+                    before, cursor = [], line_start
+                    while cursor > 0 and len(before) < context:
+                        prev = mm.rfind(b"\n", 0, cursor - 1) + 1
+                        before.insert(0, _decode_line(mm[prev:cursor - 1]))
+                        cursor = prev
+                    after, cursor = [], line_end + 1
+                    while cursor < size and len(after) < context:
+                        nxt = mm.find(b"\n", cursor)
+                        nxt = size if nxt == -1 else nxt
+                        after.append(_decode_line(mm[cursor:nxt]))
+                        cursor = nxt + 1
+                    match["before"], match["after"] = before, after
+                matches.append(match)
+                next_line = line_end + 1
+                if len(matches) >= limit:
+                    break
+    except (OSError, ValueError):
+        pass
+    return rel, matches
+
+def _search_tree(root: Path, regex: "re.Pattern", include: Optional[List[str]], exclude: Optional[List[str]],
+                 context: int, max_matches: int, use_gitignore: bool, stats: Dict):
+    """Yield (relative_name, matches) for files with matches, scanning files on a thread pool."""
+    files = _iter_search_files(root, include, exclude, use_gitignore)
+    return _search_files(files, regex, context, max_matches, stats)
+
+def _search_files(files, regex: "re.Pattern", context: int, max_matches: int, stats: Dict):
+    """Scan (path, relative_name) pairs on a thread pool, keeping at most workers * 4 queued
+    so that reaching max_matches cancels the rest instead of waiting for them."""
+    workers = CONFIG.get("search_workers", 8)
+    remaining = max_matches
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omnis-search") as pool:
+        pending, exhausted = set(), False
+        while True:
+            while not exhausted and len(pending) < workers * 4:
+                item = next(files, None)
+                if item is None:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(_search_file, item[0], item[1], regex, context, remaining))
+            if not pending:
+                return
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stats["files_scanned"] += 1
+                rel, matches = future.result()
+                if not matches:
+                    continue
+                matches = matches[:remaining]
+                remaining -= len(matches)
+                yield rel, matches
+                if remaining <= 0:
+                    stats["truncated"] = True
+                    for f in pending:
+                        f.cancel()
+                    return
+
+def _compile_search(pattern: str, regex: bool, ignore_case: bool) -> "re.Pattern":
+    source = pattern.encode("utf-8") if regex else re.escape(pattern.encode("utf-8"))
+    return re.compile(source, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+
+@mcp.tool()
+async def search_files(pattern: str, path: Optional[str] = None, regex: bool = True, ignore_case: bool = False,
+                       include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                       context: int = 0, max_matches: int = 500, use_gitignore: bool = True,
+                       force: bool = False, ctx: Optional[Context] = None) -> Dict:
+    """Search file contents under a directory (default SAFE_ZONE), streaming per-file matches as progress."""
+    logger.debug("search_files: %r in %s", pattern, path)
+    try:
+        root = Path(path).resolve() if path else SAFE_ZONE
+        # Checked once for the root: the walker never follows symlinks out of it.
+        _validate_access(root, force)
+        compiled = _compile_search(pattern, regex, ignore_case)
+    except Exception as e:
+        return {"error": str(e)}
+
+    stats = {"files_scanned": 0, "truncated": False}
+    results, total = [], 0
+    walker = _search_tree(root, compiled, include, exclude, max(0, context), max(1, max_matches), use_gitignore, stats)
+    try:
+        while (item := await asyncio.to_thread(next, walker, None)) is not None:
+            rel, matches = item
+            total += len(matches)
+            results.append({"file": rel, "matches": matches})
+            if ctx:
+                await ctx.report_progress(total, max_matches, json.dumps(results[-1]))
+    finally:
+        await asyncio.to_thread(walker.close)
+    return {
+        "root": str(root),
+        "results": results,
+        "total_matches": total,
+        "files_with_matches": len(results),
+        "files_scanned": stats["files_scanned"],
+        "truncated": stats["truncated"]
+    }
+
+# === CONTENT INDEX ===
+
+class ContentIndex:
+    """Persistent SQLite FTS5 trigram index of text files under one root."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = db_path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL)"
+        )
+        self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(body, tokenize='trigram')")
+        self.db.commit()
+        self.state = {"state": "idle", "files_seen": 0, "files_updated": 0, "files_removed": 0,
+                      "last_scan": None, "scan_seconds": None, "error": None}
+
+    def _set_root(self, root: Path) -> None:
+        """Drop everything if the index was built for a different root."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        if row and row[0] == str(root):
+            return
+        self.db.execute("DELETE FROM files")
+        self.db.execute("DELETE FROM fts")
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (str(root),))
+        self.db.commit()
+
+    def scan(self, root: Path) -> None:
+        """Bring the index up to date with root using mtime/size change detection."""
+        start = time.time()
+        self.state.update(state="scanning", files_seen=0, files_updated=0, files_removed=0, error=None)
+        limit = CONFIG.get("index_max_file_bytes", 2 * 1024 * 1024)
+        try:
+            with self.lock:
+                self._set_root(root)
+                known = {path: (fid, mtime, size) for fid, path, mtime, size in
+                         self.db.execute("SELECT id, path, mtime_ns, size FROM files")}
+            pending = 0
+            for path, _ in _iter_search_files(root, None, None, True):
+                self.state["files_seen"] += 1
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entry = known.pop(path, None)
+                if entry and entry[1:] == (st.st_mtime_ns, st.st_size):
+                    continue
+                body = self._read_text(path, st.st_size, limit)
+                with self.lock:
+                    if entry:
+                        self.db.execute("DELETE FROM fts WHERE rowid = ?", (entry[0],))
+                    fid = self.db.execute(
+                        "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?) "
+                        "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size "
+                        "RETURNING id", (path, st.st_mtime_ns, st.st_size)
+                    ).fetchone()[0]
+                    if body is not None:
+                        self.db.execute("INSERT INTO fts (rowid, body) VALUES (?, ?)", (fid, body))
+                    pending += 1
+                    if pending % 500 == 0:
+                        self.db.commit()
+                self.state["files_updated"] += 1
+            with self.lock:
+                for fid, _, _ in known.values():
+                    self.db.execute("DELETE FROM fts WHERE rowid = ?", (fid,))
+                    self.db.execute("DELETE FROM files WHERE id = ?", (fid,))
+                self.db.commit()
+            self.state["files_removed"] = len(known)
+        except Exception as e:
+            logger.error("Index scan failed: %s", e)
+            self.state["error"] = str(e)
+        self.state.update(state="idle", last_scan=datetime.now().isoformat(),
+                          scan_seconds=round(time.time() - start, 3))
+
+    @staticmethod
+    def _read_text(path: str, size: int, limit: int) -> Optional[str]:
+        """File text for indexing, or None for binary/oversized files (tracked but not searchable)."""
+        if size > limit:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\x00" in data[:8192]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def candidates(self, literals: List[str]) -> Optional[List[str]]:
+        """Paths whose text contains every literal (case-insensitive), or None if the index can't narrow."""
+        usable = [lit for lit in literals if len(lit) >= 3]
+        with self.lock:
+            if not usable:
+                return None
+            query = " AND ".join('"' + lit.replace('"', '""') + '"' for lit in usable)
+            return [row[0] for row in self.db.execute(
+                "SELECT files.path FROM fts JOIN files ON files.id = fts.rowid WHERE fts MATCH ?", (query,)
+            )]
+
+    def all_paths(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT path FROM files")]
+
+    def oversized(self, limit: int) -> List[str]:
+        """Tracked files too large to have their text indexed."""
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT path FROM files WHERE size > ?", (limit,))]
+
+    def known(self) -> Dict[str, Tuple[int, int]]:
+        with self.lock:
+            return {path: (mtime, size) for path, mtime, size in
+                    self.db.execute("SELECT path, mtime_ns, size FROM files")}
+
+    def stats(self) -> Dict:
+        with self.lock:
+            files = self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            root = self.db.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        db_bytes = sum(p.stat().st_size for p in self.path.parent.glob(self.path.name + "*"))
+        return {**self.state, "root": root[0] if root else None, "files_indexed": files, "db_bytes": db_bytes}
+
+CONTENT_INDEX: Optional[ContentIndex] = None
+_index_wakeup = threading.Event()
+_index_lock = threading.Lock()
+
+def _get_content_index() -> ContentIndex:
+    """Open the index and start the background indexer on first use."""
+    global CONTENT_INDEX
+    with _index_lock:
+        if CONTENT_INDEX is None:
+            CONTENT_INDEX = ContentIndex(INDEX_DIR / "content.db")
+            if CONFIG.get("index_enabled", True):
+                threading.Thread(target=_indexer_loop, daemon=True, name="omnis-indexer").start()
+    return CONTENT_INDEX
+
+def _indexer_loop() -> None:
+    while True:
+        if SAFE_ZONE.is_dir():
+            CONTENT_INDEX.scan(SAFE_ZONE)
+        _index_wakeup.wait(CONFIG.get("index_interval", 300))
+        _index_wakeup.clear()
+
+def _group_end(pattern: str, start: int) -> int:
+    """Index of the ")" closing the group opened at start, or -1."""
+    depth, i = 0, start
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            i = pattern.find("]", i + 2)
+            if i == -1:
+                return -1
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+def _regex_literals(pattern: str) -> List[str]:
+    """Literal runs that every match of a simple regex must contain; empty if unsure."""
+    if "|" in pattern or re.search(r"\)[?*{]", pattern):
+        return []
+    runs, current, i = [], "", 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if pattern.startswith(("(?=", "(?!", "(?<=", "(?<!"), i):
+            # Lookaround bodies are assertions, not text the match has to contain.
+            runs.append(current)
+            current = ""
+            i = _group_end(pattern, i)
+            if i == -1:
+                return []
+            i += 1
+            continue
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if nxt.isalnum():
+                runs.append(current)
+                current = ""
+            else:
+                current += nxt
+            continue
+        if ch in "?*{":
+            # The preceding character may be optional; {m,n} is treated conservatively.
+            current = current[:-1]
+            runs.append(current)
+            current = ""
+            if ch == "{":
+                i = pattern.find("}", i)
+                if i == -1:
+                    return []
+        elif ch in ".^$+()[]":
+            runs.append(current)
+            current = ""
+            if ch == "[":
+                i = pattern.find("]", i + 2)
+                if i == -1:
+                    return []
+        else:
+            current += ch
+        i += 1
+    runs.append(current)
+    return [r for r in runs if len(r) >= 3]
+
+@mcp.tool()
+def query_index(query: str, regex: bool = False, ignore_case: bool = False, max_matches: int = 200,
+                context: int = 0, include: Optional[List[str]] = None, fresh: bool = False) -> Dict:
+    """Substring/regex search over the SAFE_ZONE content index; candidates are verified against the files.
+
+    Files too large for the index are always scanned directly. Files changed since index_last_scan
+    are only seen with fresh=True, which stat-walks the whole tree (without reading) and scans new
+    or modified files directly; "complete" reports whether that walk was done.
+    """
+    logger.debug("query_index: %r", query)
+    root = SAFE_ZONE
+    try:
+        index = _get_content_index()
+        compiled = _compile_search(query, regex, ignore_case)
+        literals = _regex_literals(query) if regex else [query]
+        candidates = index.candidates(literals)
+        narrowed = candidates is not None
+        if candidates is None:
+            candidates = index.all_paths()
+        direct = index.oversized(CONFIG.get("index_max_file_bytes", 2 * 1024 * 1024))
+        if fresh and root.is_dir():
+            known = index.known()
+            for path, _ in _iter_search_files(root, None, None, True):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) != (st.st_mtime_ns, st.st_size):
+                    direct.append(path)
+        candidates = list(dict.fromkeys(candidates + direct))
+    except Exception as e:
+        return {"error": str(e)}
+
+    candidates = [p for p in candidates
+                  if not include or _glob_any(os.path.relpath(p, root), os.path.basename(p), include)]
+    stats = {"files_scanned": 0, "truncated": False}
+    files = ((p, os.path.relpath(p, root)) for p in candidates)
+    results = [{"file": rel, "matches": matches}
+               for rel, matches in _search_files(files, compiled, max(0, context), max(1, max_matches), stats)]
+    return {
+        "results": results,
+        "total_matches": sum(len(r["matches"]) for r in results),
+        "candidates": len(candidates),
+        "files_scanned": stats["files_scanned"],
+        "narrowed_by_index": narrowed,
+        "scanned_directly": len(direct),
+        "complete": fresh,
+        "truncated": stats["truncated"],
+        "index_state": index.state["state"],
+        "index_last_scan": index.state["last_scan"]
+    }
+
+@mcp.tool()
+def index_status(refresh: bool = False) -> Dict:
+    """Content index progress and size; refresh=True triggers an immediate rescan."""
+    try:
+        index = _get_content_index()
+        if refresh:
+            _index_wakeup.set()
+        return index.stats()
+    except Exception as e:
+        return {"error": str(e)}
+
+# === PROCESS MANAGEMENT ===
+
+PROCESS_ATTRS = ["ppid", "name", "username", "status", "cpu_percent", "memory_percent",
+                 "memory_info", "num_threads", "create_time", "cmdline"]
+
+class ProcessTable:
+    """psutil.Process objects kept across scans, keyed by (pid, create_time).
+
+    Reusing the same objects is what makes cpu_percent a real delta between scans; a
+    recycled pid gets a new create_time and therefore a fresh entry. Every scan is also
+    diffed against the last reported row per process, giving a versioned change log.
+    """
+
+    def __init__(self):
+        self.procs: Dict[Tuple[int, float], psutil.Process] = {}
+        self.rows: Dict[int, Dict] = {}
+        self.taken = 0.0
+        self.lock = threading.Lock()
+        self.scans = 0
+        self.scan_ms = 0.0
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.baseline: Dict[Tuple[int, float], Dict] = {}
+        self.changes: deque = deque(maxlen=CONFIG.get("process_change_history", 300))
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Keep the table (and its change log) fresh from a background thread."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="omnis-proc-sampler")
+                self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            interval = max(0.2, float(CONFIG.get("process_sample_interval", 2.0)))
+            try:
+                self.get(max_age=interval / 2)
+            except Exception as e:
+                logger.error("Process sample failed: %s", e)
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+
+    def get(self, max_age: Optional[float] = None) -> Tuple[Dict[int, Dict], float]:
+        """Rows by pid and the monotonic time they were taken; concurrent callers share one scan."""
+        ttl = CONFIG.get("process_cache_ttl", 2.0) if max_age is None else max_age
+        if time.monotonic() - self.taken > ttl:
+            with self.lock:
+                if time.monotonic() - self.taken > ttl:
+                    if not self.procs:
+                        self._scan()  # first sight of every process only primes cpu_percent
+                        time.sleep(0.1)
+                    self._scan()
+        return self.rows, self.taken
+
+    def _scan(self) -> None:
+        start = time.perf_counter()
+        procs, rows = {}, {}
+        for pid in psutil.pids():
+            try:
+                fresh = psutil.Process(pid)
+                key = (pid, fresh.create_time())
+                proc = self.procs.get(key, fresh)
+                info = proc.as_dict(PROCESS_ATTRS, ad_value=None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, ProcessLookupError):
+                continue
+            procs[key] = proc
+            mem = info.pop("memory_info")
+            cmdline = info["cmdline"]
+            info.update(pid=pid,
+                        cpu_percent=info["cpu_percent"] or 0.0,
+                        memory_percent=round(info["memory_percent"] or 0.0, 2),
+                        rss_mb=round(mem.rss / (1024**2), 2) if mem else 0.0,
+                        cmdline=" ".join(cmdline) if cmdline else "")
+            rows[pid] = info
+        self.procs, self.rows = procs, rows
+        self.taken = time.monotonic()
+        self.scans += 1
+        self._record_changes(rows)
+        self.scan_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def _record_changes(self, rows: Dict[int, Dict]) -> None:
+        cpu_delta = CONFIG.get("process_change_cpu", 5.0)
+        rss_delta = CONFIG.get("process_change_rss_mb", 10.0)
+        current = {(pid, row["create_time"]): row for pid, row in rows.items()}
+        started, changed = [], []
+        for key, row in current.items():
+            base = self.baseline.get(key)
+            if base is None:
+                started.append(row)
+            elif (row["status"] != base["status"] or
+                  abs(row["cpu_percent"] - base["cpu_percent"]) >= cpu_delta or
+                  abs(row["rss_mb"] - base["rss_mb"]) >= rss_delta):
+                changed.append(row)
+            else:
+                continue
+            self.baseline[key] = row
+        exited = [key for key in self.baseline if key not in current]
+        for key in exited:
+            del self.baseline[key]
+        self.version += 1
+        self.changes.append((self.version, started, changed, [pid for pid, _ in exited]))
+
+PROCESS_TABLE = ProcessTable()
+
+@mcp.tool()
+def list_processes(limit: int = 50, sort_by: str = "cpu_percent") -> List[Dict]:
+    """Top processes by cpu_percent, memory_percent, rss_mb or num_threads, from the cached process table."""
+    logger.debug("list_processes called")
+    if sort_by not in ("cpu_percent", "memory_percent", "rss_mb", "num_threads"):
+        return [{"error": f"Cannot sort by '{sort_by}'"}]
+    try:
+        rows, _ = PROCESS_TABLE.get()
+        top = heapq.nlargest(limit, rows.values(), key=lambda row: row[sort_by] or 0)
+        return [{"pid": row["pid"], "name": row["name"], "cpu_percent": row["cpu_percent"],
+                 "memory_percent": row["memory_percent"]} for row in top]
     except Exception as e:
         return [{"error": str(e)}]
 
+PROCESS_FIELDS = ["pid", "ppid", "name", "username", "status", "cpu_percent", "memory_percent",
+                  "rss_mb", "num_threads", "create_time", "cmdline"]
+
+@mcp.tool()
+def query_processes(name: Optional[str] = None, cmdline: Optional[str] = None, user: Optional[str] = None,
+                    min_cpu: Optional[float] = None, min_rss_mb: Optional[float] = None,
+                    status: Optional[str] = None, ppid: Optional[int] = None,
+                    fields: Optional[List[str]] = None, sort_by: str = "cpu_percent",
+                    descending: bool = True, limit: int = 50) -> Dict:
+    """Filter the cached process table server-side and return only the requested columns.
+
+    name and cmdline are case-insensitive regexes; user and status match exactly.
+    fields defaults to pid, name, cpu_percent and rss_mb.
+    """
+    logger.debug("query_processes: name=%s cmdline=%s user=%s", name, cmdline, user)
+    fields = fields or ["pid", "name", "cpu_percent", "rss_mb"]
+    unknown = [f for f in fields + [sort_by] if f not in PROCESS_FIELDS]
+    if unknown:
+        return {"error": f"Unknown field(s) {unknown}, use {PROCESS_FIELDS}"}
+    try:
+        name_re = re.compile(name, re.IGNORECASE) if name else None
+        cmd_re = re.compile(cmdline, re.IGNORECASE) if cmdline else None
+    except re.error as e:
+        return {"error": f"Invalid regex: {e}"}
+
+    def keep(row: Dict) -> bool:
+        return ((name_re is None or name_re.search(row["name"] or "")) and
+                (cmd_re is None or cmd_re.search(row["cmdline"])) and
+                (user is None or row["username"] == user) and
+                (status is None or row["status"] == status) and
+                (ppid is None or row["ppid"] == ppid) and
+                (min_cpu is None or row["cpu_percent"] >= min_cpu) and
+                (min_rss_mb is None or row["rss_mb"] >= min_rss_mb))
+
+    rows, taken = PROCESS_TABLE.get()
+    matched = [row for row in rows.values() if keep(row)]
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    empty = "" if sort_by in ("name", "username", "status", "cmdline") else 0
+    top = pick(limit, matched, key=lambda row: row[sort_by] if row[sort_by] is not None else empty)
+    return {
+        "matched": len(matched),
+        "snapshot_age_s": round(time.monotonic() - taken, 3),
+        "columns": fields,
+        "rows": [[row[f] for f in fields] for row in top]
+    }
+
+@mcp.tool()
+def process_changes(cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict:
+    """Processes started, exited or significantly changed since cursor, plus the next cursor.
+
+    Without a cursor, or with one that is too old or from an earlier server run, the full table
+    is returned as "started" with reset=true. Apply "exited" before "started" (pids can be reused).
+    """
+    fields = fields or ["pid", "ppid", "name", "status", "cpu_percent", "rss_mb"]
+    unknown = [f for f in fields if f not in PROCESS_FIELDS]
+    if unknown:
+        return {"error": f"Unknown field(s) {unknown}, use {PROCESS_FIELDS}"}
+    PROCESS_TABLE.start()
+    PROCESS_TABLE.get()
+    with PROCESS_TABLE.lock:
+        rows, version, epoch = PROCESS_TABLE.rows, PROCESS_TABLE.version, PROCESS_TABLE.epoch
+        changes = list(PROCESS_TABLE.changes)
+    since = None
+    if cursor:
+        cursor_epoch, _, cursor_version = cursor.partition(":")
+        if cursor_epoch == epoch and cursor_version.isdigit():
+            since = int(cursor_version)
+            if changes and since < changes[0][0] - 1:
+                since = None
+
+    project = lambda row: [row[f] for f in fields]
+    if since is None:
+        return {"cursor": f"{epoch}:{version}", "reset": True, "columns": fields,
+                "started": [project(row) for row in rows.values()], "changed": [], "exited": []}
+
+    started, changed, exited = {}, {}, set()
+    for entry_version, entry_started, entry_changed, entry_exited in changes:
+        if entry_version <= since:
+            continue
+        for pid in entry_exited:
+            changed.pop(pid, None)
+            if started.pop(pid, None) is None:
+                exited.add(pid)
+        for row in entry_started:
+            started[row["pid"]] = row
+        for row in entry_changed:
+            (started if row["pid"] in started else changed)[row["pid"]] = row
+    return {"cursor": f"{epoch}:{version}", "reset": False, "columns": fields,
+            "started": [project(row) for row in started.values()],
+            "changed": [project(row) for row in changed.values()],
+            "exited": sorted(exited)}
+
+@mcp.tool()
+def process_tree(root_pid: Optional[int] = None, max_depth: int = 3, sort_by: str = "rss",
+                 min_cpu: float = 1.0, min_rss_mb: float = 50.0, limit: int = 20) -> Dict:
+    """Process hierarchy with CPU, RSS and thread totals rolled up each subtree, heaviest first.
+
+    Built in one pass over the cached process table. Children whose subtree stays under both
+    min_cpu and min_rss_mb are folded into a single "other" entry; nodes at max_depth report
+    only their totals. sort_by is "rss" or "cpu".
+    """
+    logger.debug("process_tree: root=%s depth=%s", root_pid, max_depth)
+    if sort_by not in ("rss", "cpu"):
+        return {"error": "sort_by must be 'rss' or 'cpu'"}
+    rows, taken = PROCESS_TABLE.get()
+    children: Dict[int, List[int]] = {}
+    roots = []
+    for pid, row in rows.items():
+        ppid = row["ppid"]
+        # A child older than its parent inherited a recycled ppid: treat it as a root.
+        if ppid in rows and ppid != pid and (row.get("create_time") or 0) >= (rows[ppid].get("create_time") or 0):
+            children.setdefault(ppid, []).append(pid)
+        else:
+            roots.append(pid)
+    if root_pid is not None:
+        if root_pid not in rows:
+            return {"error": f"No such process: {root_pid}"}
+        roots = [root_pid]
+
+    totals: Dict[int, List[float]] = {}
+    order, seen = list(roots), set(roots)
+    tree: Dict[int, List[int]] = {}
+    for pid in order:  # breadth-first; the list grows while iterating
+        # Each pid is visited once, so a ppid cycle in a racing snapshot cannot loop.
+        kids = tree[pid] = [c for c in children.get(pid, []) if c not in seen]
+        seen.update(kids)
+        order.extend(kids)
+    for pid in reversed(order):
+        row = rows[pid]
+        total = [row["cpu_percent"], row["rss_mb"], row["num_threads"] or 0, 0]
+        for child in tree[pid]:
+            sub = totals[child]
+            total[0] += sub[0]
+            total[1] += sub[1]
+            total[2] += sub[2]
+            total[3] += sub[3] + 1
+        totals[pid] = total
+    weight = (lambda pid: totals[pid][1]) if sort_by == "rss" else (lambda pid: totals[pid][0])
+
+    def node(pid: int, depth: int) -> Dict:
+        row, total = rows[pid], totals[pid]
+        out = {"pid": pid, "name": row["name"], "cpu_percent": row["cpu_percent"], "rss_mb": row["rss_mb"],
+               "total_cpu": round(total[0], 1), "total_rss_mb": round(total[1], 1),
+               "total_threads": int(total[2]), "descendants": int(total[3])}
+        kids = sorted(tree[pid], key=weight, reverse=True)
+        if kids and depth < max_depth:
+            big, small = [], []
+            for k in kids:
+                (big if totals[k][0] >= min_cpu or totals[k][1] >= min_rss_mb else small).append(k)
+            out["children"] = [node(k, depth + 1) for k in big]
+            if small:
+                out["children"].append({
+                    "other": len(small),
+                    "total_cpu": round(sum(totals[k][0] for k in small), 1),
+                    "total_rss_mb": round(sum(totals[k][1] for k in small), 1)
+                })
+        return out
+
+    top = sorted(roots, key=weight, reverse=True)[:limit]
+    return {
+        "snapshot_age_s": round(time.monotonic() - taken, 3),
+        "processes": len(rows),
+        "roots": [node(pid, 0) for pid in top]
+    }
+
 @mcp.tool()
 def kill_process(pid_or_name: Union[int, str], force: bool = False) -> str:
     """Terminate a process by PID or name."""
-    logger.warning(f"kill_process: {pid_or_name}")
-    _audit_log("kill_process", str(pid_or_name))
+    logger.warning("kill_process: %s", pid_or_name)
+    start = time.perf_counter()
     
     try:
         if isinstance(pid_or_name, int):
@@ -292,74 +2902,386 @@ def kill_process(pid_or_name: Union[int, str], force: bool = False) -> str:
                     proc = p
                     break
             else:
+                _audit_log("kill_process", f"{pid_or_name}: not found", False, _elapsed_ms(start))
                 return f"Process '{pid_or_name}' not found"
         
         proc.terminate() if not force else proc.kill()
+        _audit_log("kill_process", f"{pid_or_name} pid={proc.pid}", duration_ms=_elapsed_ms(start))
         return f"Terminated PID {proc.pid}"
     except Exception as e:
+        _audit_log("kill_process", f"{pid_or_name}: {e}", False, _elapsed_ms(start))
         return f"Error: {e}"
 
+KILL_MIN_NAME_LEN = 3
+
+@mcp.tool()
+def kill_processes(targets: List[Union[int, str]], force: bool = False, tree: bool = False,
+                   regex: bool = False, timeout: float = 5.0) -> Dict:
+    """Terminate every process matching any target, resolved in a single process scan.
+
+    Targets are pids or case-insensitive name substrings (regexes with regex=true). tree=true also
+    takes each match's descendants. Survivors of terminate are killed once timeout expires.
+    Substrings shorter than KILL_MIN_NAME_LEN and regexes matching the empty string are reported
+    as "invalid" instead of matching every process. The server and its ancestors are never signalled:
+    they are listed under "protected", and a target matching only them has status "protected".
+    """
+    logger.warning("kill_processes: %s tree=%s", targets, tree)
+    start = time.perf_counter()
+    report = [{"target": target, "matched": [], "protected": [], "terminated": [], "killed": [], "failed": []}
+              for target in targets]
+    try:
+        matchers = []
+        for index, target in enumerate(targets):
+            if isinstance(target, int) or (isinstance(target, str) and target.isdigit()):
+                matchers.append(("pid", int(target)))
+            elif regex:
+                pattern = re.compile(target, re.IGNORECASE)
+                if pattern.search(""):
+                    report[index]["error"] = "pattern matches every process name"
+                    matchers.append(("none", None))
+                else:
+                    matchers.append(("name", pattern.search))
+            elif len(target.strip()) < KILL_MIN_NAME_LEN:
+                report[index]["error"] = f"name substring must be at least {KILL_MIN_NAME_LEN} characters"
+                matchers.append(("none", None))
+            else:
+                needle = target.lower()
+                matchers.append(("name", lambda name, needle=needle: needle in name.lower()))
+    except re.error as e:
+        _audit_log("kill_processes", f"{targets}: invalid regex {e}", False, _elapsed_ms(start))
+        return {"error": f"Invalid regex: {e}"}
+
+    procs, children = {}, {}
+    for proc in psutil.process_iter(["pid", "name", "ppid", "create_time"]):
+        procs[proc.pid] = proc
+        children.setdefault(proc.info["ppid"], []).append(proc.pid)
+
+    # Our ancestors are as vital as we are: killing the client or its shell ends the session.
+    protected = {os.getpid()} | {p.pid for p in psutil.Process().parents()}
+    owner: Dict[int, int] = {}
+    for pid, proc in procs.items():
+        for index, (kind, match) in enumerate(matchers):
+            if kind == "none":
+                continue
+            if (pid == match) if kind == "pid" else match(proc.info["name"] or ""):
+                owner.setdefault(pid, index)
+                break
+    if tree:
+        for pid, index in list(owner.items()):
+            stack = [pid]
+            while stack:
+                parent = stack.pop()
+                born = procs[parent].info["create_time"] or 0
+                for child in children.get(parent, []):
+                    # A child older than its parent inherited a recycled ppid; it is not a descendant.
+                    if child not in owner and (procs[child].info["create_time"] or 0) >= born:
+                        owner[child] = index
+                        stack.append(child)
+
+    signalled = []
+    for pid, index in owner.items():
+        if pid in protected:
+            report[index]["protected"].append(pid)
+            continue
+        report[index]["matched"].append(pid)
+        try:
+            procs[pid].kill() if force else procs[pid].terminate()
+            signalled.append(procs[pid])
+        except psutil.NoSuchProcess:
+            report[index]["terminated"].append(pid)
+        except Exception as e:
+            report[index]["failed"].append({"pid": pid, "error": str(e)})
+
+    gone, alive = psutil.wait_procs(signalled, timeout=max(0.0, timeout))
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            gone.append(proc)
+        except Exception as e:
+            report[owner[proc.pid]]["failed"].append({"pid": proc.pid, "error": str(e)})
+    killed, still_alive = psutil.wait_procs([p for p in alive if p not in gone], timeout=1)
+    for proc in gone:
+        report[owner[proc.pid]]["terminated"].append(proc.pid)
+    for proc in killed:
+        report[owner[proc.pid]]["killed"].append(proc.pid)
+    for proc in still_alive:
+        report[owner[proc.pid]]["failed"].append({"pid": proc.pid, "error": "still running after kill"})
+    for entry in report:
+        if "error" in entry:
+            entry["status"] = "invalid"
+        elif not entry["matched"]:
+            entry["status"] = "protected" if entry["protected"] else "not_found"
+        else:
+            entry["status"] = "failed" if entry["failed"] else "ok"
+    matched = sum(len(e["matched"]) for e in report)
+    _audit_log("kill_processes", json.dumps({"targets": targets, "force": force, "tree": tree, "matched": matched}),
+               not any(e["failed"] for e in report), _elapsed_ms(start))
+    return {"targets": report, "matched": matched}
+
+def _process_record(proc: psutil.Process, cpu: Optional[float]) -> Dict:
+    info = proc.as_dict(["name", "status", "memory_info", "num_threads", "create_time"], ad_value=None)
+    return {
+        "pid": proc.pid,
+        "name": info["name"],
+        "status": info["status"],
+        "cpu_percent": cpu,
+        "memory_mb": round(info["memory_info"].rss / (1024**2), 2) if info["memory_info"] else None,
+        "num_threads": info["num_threads"],
+        "create_time": datetime.fromtimestamp(info["create_time"]).isoformat()
+    }
+
+@mcp.tool()
+def get_processes_info(pids: List[int], cpu_interval: float = 0.1) -> List[Dict]:
+    """Detailed information for several pids in one call.
+
+    CPU comes from the background process table when it holds a recent sample of the same
+    process; the rest share a single cpu_interval sampling window. Vanished or inaccessible
+    pids get an error record instead of failing the batch.
+    """
+    logger.debug("get_processes_info: %d pids", len(pids))
+    records: Dict[int, Dict] = {}
+    procs: Dict[int, psutil.Process] = {}
+    for pid in dict.fromkeys(pids):
+        try:
+            procs[pid] = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            records[pid] = {"pid": pid, "error": "no such process"}
+        except Exception as e:
+            records[pid] = {"pid": pid, "error": str(e)}
+
+    table_age = time.monotonic() - PROCESS_TABLE.taken
+    table = PROCESS_TABLE.rows if table_age <= 2 * CONFIG.get("process_sample_interval", 2.0) else {}
+    cpu: Dict[int, float] = {}
+    sampled = []
+    for pid, proc in procs.items():
+        row = table.get(pid)
+        if row is not None and row["create_time"] == proc.create_time():
+            cpu[pid] = row["cpu_percent"]
+            continue
+        try:
+            proc.cpu_percent(None)
+            sampled.append(proc)
+        except psutil.Error:
+            pass
+    if sampled and cpu_interval > 0:
+        time.sleep(cpu_interval)
+    for proc in sampled:
+        try:
+            cpu[proc.pid] = proc.cpu_percent(None)
+        except psutil.Error:
+            pass
+
+    for pid, proc in procs.items():
+        try:
+            records[pid] = _process_record(proc, cpu.get(pid))
+        except psutil.NoSuchProcess:
+            records[pid] = {"pid": pid, "error": "process exited"}
+        except Exception as e:
+            records[pid] = {"pid": pid, "error": str(e)}
+    return [records[pid] for pid in dict.fromkeys(pids)]
+
 @mcp.tool()
 def get_process_info(pid: int) -> Dict:
     """Detailed process information."""
-    try:
-        proc = psutil.Process(pid)
-        return {
-            "pid": proc.pid,
-            "name": proc.name(),
-            "status": proc.status(),
-            "cpu_percent": proc.cpu_percent(interval=0.1),
-            "memory_mb": round(proc.memory_info().rss / (1024**2), 2),
-            "num_threads": proc.num_threads(),
-            "create_time": datetime.fromtimestamp(proc.create_time()).isoformat()
-        }
-    except Exception as e:
-        return {"error": str(e)}
+    return get_processes_info([pid])[0]
 
 # === ENHANCED MONITORING ===
 
 @mcp.tool()
 def disk_stats() -> List[Dict]:
-    """Disk usage per partition."""
+    """Disk usage per partition; mounts that do not answer within disk_probe_timeout are marked hung."""
     logger.debug("disk_stats called")
     try:
-        partitions = []
-        for part in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(part.mountpoint)
-                partitions.append({
-                    "device": part.device,
-                    "mountpoint": part.mountpoint,
-                    "total_gb": round(usage.total / (1024**3), 2),
-                    "used_gb": round(usage.used / (1024**3), 2),
-                    "free_gb": round(usage.free / (1024**3), 2),
-                    "percent": usage.percent
-                })
-            except:
-                pass
-        return partitions
+        return [dict(part) for part in DISK_PROBER.get()]
     except Exception as e:
         return [{"error": str(e)}]
 
 @mcp.tool()
 def network_stats() -> Dict:
-    """Network interface statistics."""
+    """Network interface statistics, from the latest telemetry snapshot."""
     logger.debug("network_stats called")
+    snap = TELEMETRY.get()
+    if snap is None:
+        return {"error": "Telemetry not yet available"}
+    return {
+        iface: {
+            "bytes_sent_mb": round(stat["bytes_sent"] / (1024**2), 2),
+            "bytes_recv_mb": round(stat["bytes_recv"] / (1024**2), 2),
+            "packets_sent": stat["packets_sent"],
+            "packets_recv": stat["packets_recv"]
+        } for iface, stat in snap["network"].items()
+    }
+
+def _io_rates(kind: int, window: Union[int, str]) -> Union[Tuple, str]:
+    """TELEMETRY.io_rates for a user-supplied window, or an error message."""
     try:
-        stats = psutil.net_io_counters(pernic=True)
-        return {
-            iface: {
-                "bytes_sent_mb": round(stat.bytes_sent / (1024**2), 2),
-                "bytes_recv_mb": round(stat.bytes_recv / (1024**2), 2),
-                "packets_sent": stat.packets_sent,
-                "packets_recv": stat.packets_recv
-            } for iface, stat in stats.items()
+        window_s = _parse_duration(window)
+    except ValueError as e:
+        return str(e)
+    if window_s <= 0:
+        return f"window must be positive, got {window!r}"
+    TELEMETRY.get()
+    rates = TELEMETRY.io_rates(kind, window_s)
+    if rates is None:
+        return "Rates need two telemetry samples; retry after telemetry_interval"
+    return rates
+
+@mcp.tool()
+def network_rates(window: Union[int, str] = "10s", interface: Optional[str] = None) -> Dict:
+    """Per-interface bytes/s, packets/s, error and drop rates over the given window (seconds or "1m").
+
+    Computed from counters the telemetry sampler already holds, so the call never sleeps.
+    """
+    logger.debug("network_rates: window=%s", window)
+    rates = _io_rates(1, window)
+    if isinstance(rates, str):
+        return {"error": rates}
+    elapsed, age, per_nic = rates
+    if interface is not None:
+        if interface not in per_nic:
+            return {"error": f"Unknown interface '{interface}'", "interfaces": sorted(per_nic)}
+        per_nic = {interface: per_nic[interface]}
+    return {
+        "window_s": round(elapsed, 2),
+        "sample_age_s": round(age, 3),
+        "interfaces": {
+            nic: {
+                "sent_bytes_per_s": round(r["bytes_sent"], 1),
+                "recv_bytes_per_s": round(r["bytes_recv"], 1),
+                "sent_packets_per_s": round(r["packets_sent"], 2),
+                "recv_packets_per_s": round(r["packets_recv"], 2),
+                "errors_per_s": round(r["errin"] + r["errout"], 3),
+                "drops_per_s": round(r["dropin"] + r["dropout"], 3)
+            } for nic, r in per_nic.items()
         }
-    except Exception as e:
+    }
+
+@mcp.tool()
+def disk_io_rates(window: Union[int, str] = "10s", disk: Optional[str] = None) -> Dict:
+    """Per-disk read/write bytes/s, IOPS and busy percentage (where the OS reports busy time)."""
+    logger.debug("disk_io_rates: window=%s", window)
+    rates = _io_rates(2, window)
+    if isinstance(rates, str):
+        return {"error": rates}
+    elapsed, age, per_disk = rates
+    if disk is not None:
+        if disk not in per_disk:
+            return {"error": f"Unknown disk '{disk}'", "disks": sorted(per_disk)}
+        per_disk = {disk: per_disk[disk]}
+    disks = {}
+    for name, r in per_disk.items():
+        entry = {
+            "read_bytes_per_s": round(r["read_bytes"], 1),
+            "write_bytes_per_s": round(r["write_bytes"], 1),
+            "read_iops": round(r["read_count"], 2),
+            "write_iops": round(r["write_count"], 2)
+        }
+        if "busy_time" in r:  # milliseconds of busy time per second
+            entry["busy_percent"] = round(min(100.0, r["busy_time"] / 10), 1)
+        disks[name] = entry
+    return {"window_s": round(elapsed, 2), "sample_age_s": round(age, 3), "disks": disks}
+
+HISTORY_RESOLUTIONS = {"1s": 0, "1m": 1, "15m": 2}
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhd]?)$")
+
+def _parse_duration(value: Union[int, float, str]) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _DURATION_RE.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+@mcp.tool()
+def stats_history(metric: Optional[str] = None, window: Union[int, str] = "10m",
+                  resolution: Optional[str] = None) -> Dict:
+    """Telemetry history as [ts, min, max, avg] rows.
+
+    window is seconds or a duration such as "90s", "6h", "30d". resolution is "1s" (last 10 min),
+    "1m" (last 24 h) or "15m" (last 30 days); by default the finest one covering the window.
+    Without a metric, lists the recorded metric names.
+    """
+    logger.debug("stats_history: %s window=%s resolution=%s", metric, window, resolution)
+    TELEMETRY.start()
+    if metric is None:
+        return {"metrics": HISTORY.metrics(), "memory_bytes": HISTORY.memory_bytes(),
+                "dropped_metrics": HISTORY.dropped_metrics}
+    try:
+        window_s = _parse_duration(window)
+    except ValueError as e:
         return {"error": str(e)}
+    if resolution is None:
+        level = next((i for i, (step, cap) in enumerate(HISTORY_TIERS) if step * cap >= window_s),
+                     len(HISTORY_TIERS) - 1)
+    elif resolution in HISTORY_RESOLUTIONS:
+        level = HISTORY_RESOLUTIONS[resolution]
+    else:
+        return {"error": f"Unknown resolution '{resolution}', use one of {list(HISTORY_RESOLUTIONS)}"}
+    step, cap = HISTORY_TIERS[level]
+    rows = HISTORY.query(metric, min(window_s, step * cap), level)
+    if rows is None:
+        return {"error": f"Unknown metric '{metric}'", "metrics": HISTORY.metrics()}
+    return {
+        "metric": metric,
+        "resolution_s": step,
+        "window_s": min(window_s, step * cap),
+        "columns": ["ts", "min", "max", "avg"],
+        "rows": rows
+    }
 
 # === CONFIGURATION TOOLS ===
 
+@mcp.tool()
+def check_commands(commands: List[str]) -> List[Dict]:
+    """Validate a batch of commands against the command policy without running them."""
+    policy = _get_policy()
+    results = []
+    for command in commands:
+        allowed, reason = policy.check(command)
+        results.append({"command": command, "allowed": allowed, "reason": reason})
+    return results
+
+@mcp.tool()
+def set_log_level(level: str, logger_name: str = "OmnisNexus") -> str:
+    """Change a logger's level at runtime (e.g. 'OmnisNexus', 'fastmcp', 'mcp')."""
+    try:
+        logging.getLogger(logger_name).setLevel(level.upper())
+    except (ValueError, TypeError) as e:
+        return f"Error: {e}"
+    logger.info("set_log_level: %s=%s", logger_name, level.upper())
+    return f"{logger_name} level set to {level.upper()}"
+
+@mcp.tool()
+def get_log_levels() -> Dict:
+    """Effective levels of known loggers plus logging pipeline counters."""
+    names = ["OmnisNexus"] + sorted(n for n in logging.root.manager.loggerDict
+                                    if n.split(".")[0] in ("OmnisNexus", "fastmcp", "mcp", "nexus_expansions"))
+    return {
+        "levels": {n: logging.getLevelName(logging.getLogger(n).getEffectiveLevel()) for n in dict.fromkeys(names)},
+        "queued": log_queue.qsize(),
+        "dropped": queue_handler.dropped,
+        "suppressed_debug": log_rate_filter.suppressed
+    }
+
+@mcp.tool()
+def audit_status() -> Dict:
+    """Audit writer queue depth, written/dropped counters and policy."""
+    return AUDIT_WRITER.status()
+
+@mcp.tool()
+def check_paths(paths: List[str]) -> List[Dict]:
+    """Validate a batch of paths against the allow/deny path policy."""
+    policy = _get_path_policy()
+    results = []
+    for path in paths:
+        try:
+            allowed, resolved, reason = policy.check(path)
+        except Exception as e:
+            allowed, resolved, reason = False, None, str(e)
+        results.append({"path": path, "allowed": allowed, "resolved": resolved, "reason": reason})
+    return results
+
 @mcp.tool()
 def get_config(key: Optional[str] = None) -> Union[Dict, str]:
     """Get configuration value(s)."""
@@ -370,12 +3292,262 @@ def get_config(key: Optional[str] = None) -> Union[Dict, str]:
 @mcp.tool()
 def set_config(key: str, value: Union[str, bool, int, list]) -> str:
     """Set configuration value."""
-    logger.info(f"set_config: {key}={value}")
+    global SAFE_ZONE, _path_policy
+    logger.info("set_config: %s=%s", key, value)
     CONFIG[key] = value
+    if key in POLICY_KEYS:
+        _invalidate_policy()
+    if key == "safe_zone":
+        SAFE_ZONE = Path(value).resolve()
+    if key in PATH_POLICY_KEYS:
+        _path_policy = None
+    if key in ("log_level", "log_debug_rate", "log_rate_window"):
+        _apply_logging_config()
+    if key == "telemetry_interval":
+        TELEMETRY.wakeup.set()
     _save_config(CONFIG)
     _audit_log("set_config", f"{key}={value}")
     return f"Config updated: {key}={value}"
 
+# === AUDIT QUERY ===
+
+_audit_live_index: Dict[str, Dict] = {}
+_audit_index_lock = threading.Lock()
+
+def _live_audit_index(path: Path) -> List[list]:
+    """Sparse [ts, offset] index of the active segment, extended incrementally as it grows."""
+    key = str(path)
+    st = path.stat()
+    file_id = (st.st_dev, st.st_ino)
+    with _audit_index_lock:
+        state = _audit_live_index.get(key)
+        # Rotation swaps in a new file that may already have outgrown the old offset.
+        if state is None or state["file_id"] != file_id or st.st_size < state["upto"]:
+            state = _audit_live_index[key] = {"file_id": file_id, "upto": 0, "entries": [],
+                                              "last": -AUDIT_INDEX_BLOCK}
+        with open(path, "rb") as f:
+            f.seek(state["upto"])
+            offset = state["upto"]
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # record still being written
+                if offset - state["last"] >= AUDIT_INDEX_BLOCK:
+                    try:
+                        state["entries"].append([json.loads(line)["ts"], offset])
+                        state["last"] = offset
+                    except (ValueError, KeyError):
+                        pass
+                offset += len(line)
+            state["upto"] = offset
+        return list(state["entries"])
+
+def _audit_segments() -> List[Tuple[Path, List[list], bool]]:
+    """(path, sparse index, compressed) for every segment, oldest first."""
+    segments = []
+    for gz in sorted(AUDIT_LOG.parent.glob(f"{AUDIT_LOG.name}.*.gz")):
+        try:
+            with open(f"{gz}.idx") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = []  # no sidecar: scan from the start
+        segments.append((gz, index, True))
+    if AUDIT_LOG.exists():
+        segments.append((AUDIT_LOG, _live_audit_index(AUDIT_LOG), False))
+    return segments
+
+def _iter_audit_lines(path: Path, offset: int, compressed: bool):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        stream = gzip.GzipFile(fileobj=f) if compressed else f
+        for line in stream:
+            if line.endswith(b"\n"):
+                yield line
+
+def _iter_audit_records(since: Optional[str], until: Optional[str]):
+    """Records with since <= ts <= until, seeking each segment via its sparse index."""
+    segments = _audit_segments()
+    for i, (path, index, compressed) in enumerate(segments):
+        next_first = segments[i + 1][1][0][0] if i + 1 < len(segments) and segments[i + 1][1] else None
+        if since and next_first and next_first <= since:
+            continue  # whole segment is older than the window
+        if until and index and index[0][0] > until:
+            return
+        offset = 0
+        if since and index:
+            pos = bisect.bisect_left([ts for ts, _ in index], since) - 1
+            offset = index[max(0, pos)][1]
+        for line in _iter_audit_lines(path, offset, compressed):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            ts = record.get("ts", "")
+            if since and ts < since:
+                continue
+            if until and ts > until:
+                return
+            yield record
+
+@mcp.tool()
+def query_audit(since: Optional[str] = None, until: Optional[str] = None, action: Optional[str] = None,
+                success: Optional[bool] = None, contains: Optional[str] = None, limit: int = 100,
+                page_token: Optional[str] = None, bucket_seconds: Optional[int] = None) -> Dict:
+    """Query audit records by ISO time range, action, success and substring.
+
+    bucket_seconds adds counts per action per time bucket over the whole match set.
+    """
+    logger.debug("query_audit: %s..%s action=%s", since, until, action)
+    try:
+        AUDIT_WRITER.flush()
+        query = json.dumps([since, until, action, success, contains])
+        key = hashlib.sha1(query.encode()).hexdigest()[:16]
+        skip = 0
+        if page_token:
+            token = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+            if token["k"] != key:
+                raise ValueError("page_token does not match this query")
+            since, skip = token["ts"], token["skip"]
+
+        needle = contains.lower() if contains else None
+        records, buckets, matched = [], {}, 0
+        last_ts, same_ts, next_token = None, 0, None
+        for record in _iter_audit_records(since, until):
+            if action and record.get("action") != action:
+                continue
+            if success is not None and record.get("success") != success:
+                continue
+            if needle and needle not in str(record.get("details", "")).lower():
+                continue
+            ts = record.get("ts")
+            if skip:
+                # Already returned on an earlier page that ended on this timestamp.
+                skip -= 1
+                same_ts, last_ts = (same_ts + 1 if ts == last_ts else 1), ts
+                continue
+            matched += 1
+            if bucket_seconds:
+                epoch = datetime.fromisoformat(ts).timestamp()
+                bucket = datetime.fromtimestamp(epoch - epoch % bucket_seconds).isoformat()
+                counts = buckets.setdefault(bucket, {})
+                counts[record["action"]] = counts.get(record["action"], 0) + 1
+            if len(records) < limit:
+                records.append(record)
+                same_ts, last_ts = (same_ts + 1 if ts == last_ts else 1), ts
+            elif next_token is None:
+                # Resume at the last returned timestamp, skipping the records sent with it.
+                next_token = base64.urlsafe_b64encode(
+                    json.dumps({"k": key, "ts": last_ts, "skip": same_ts}).encode()
+                ).decode()
+                if not bucket_seconds:
+                    break
+        result = {"records": records, "next_page_token": next_token}
+        if bucket_seconds:
+            result["buckets"] = buckets
+            result["total_matched"] = matched
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
+# === BATCH EXECUTION ===
+
+# Tools that may be invoked through batch_execute; each still applies its own safety checks.
+BATCH_TOOLS = [
+    "system_stats", "stats_history", "disk_stats", "network_stats", "network_rates", "disk_io_rates",
+    "list_processes", "query_processes", "process_changes", "process_tree", "get_process_info", "get_processes_info",
+    "kill_process", "kill_processes",
+    "run_command", "list_directory", "read_file", "file_info", "write_file", "patch_file", "list_rollbacks",
+    "get_config", "audit_status", "query_audit", "check_commands", "check_paths", "query_index", "index_status",
+    "shell_exec", "submit_job", "job_status", "job_output", "list_jobs", "read_command_output"
+]
+
+# Twice batch_max_workers: calls abandoned at a deadline keep their thread until they return,
+# and the headroom lets fresh batches run while up to batch_max_workers of them linger.
+_batch_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=2 * CONFIG.get("batch_max_workers", 8), thread_name_prefix="omnis-batch"
+)
+_batch_stragglers: set = set()
+
+def _is_error_result(result) -> bool:
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, str):
+        return result.startswith(("Error", "ERROR"))
+    if isinstance(result, list) and len(result) == 1 and isinstance(result[0], dict):
+        return "error" in result[0]
+    return False
+
+def _run_batch_call(index: int, tool: str, args: Dict) -> Dict:
+    func = globals().get(tool) if tool in BATCH_TOOLS else None
+    if func is None:
+        _audit_log("batch_call", f"#{index} {tool}: not batchable", False)
+        return {"ok": False, "error": f"Tool '{tool}' cannot be batched"}
+    start = time.perf_counter()
+    try:
+        result = func(**args)
+        slot = {"ok": not _is_error_result(result), "result": result}
+    except Exception as e:
+        slot = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    slot["duration_ms"] = _elapsed_ms(start)
+    _audit_log("batch_call", f"#{index} {tool} {json.dumps(args, default=str)}", slot["ok"], slot["duration_ms"])
+    return slot
+
+@mcp.tool()
+def batch_execute(calls: List[Dict], fail_fast: bool = False, deadline: float = 30.0) -> Dict:
+    """Run many tool calls concurrently. Each call is {"tool": name, "args": {...}}.
+
+    Python threads cannot be interrupted, so calls still running at the deadline are reported
+    as failed but keep their worker until they return. While batch_max_workers such calls are
+    outstanding, new batches are refused rather than queued behind them.
+    """
+    logger.info("batch_execute: %s calls", len(calls))
+    if len(calls) > CONFIG.get("batch_max_calls", 64):
+        return {"error": f"Too many calls (max {CONFIG.get('batch_max_calls', 64)})"}
+    if len(_batch_stragglers) >= CONFIG.get("batch_max_workers", 8):
+        return {"error": f"Batch pool busy: {len(_batch_stragglers)} calls still running past their deadline"}
+    tools = [call.get("tool") if isinstance(call, dict) else None for call in calls]
+    start = time.perf_counter()
+    results: List[Optional[Dict]] = [None] * len(calls)
+    futures = {}
+    for i, call in enumerate(calls):
+        if not isinstance(call, dict):
+            results[i] = {"ok": False, "error": "call must be an object"}
+            continue
+        args = call.get("args") or {}
+        if not isinstance(args, dict):
+            results[i] = {"ok": False, "error": "args must be an object"}
+            continue
+        futures[_batch_pool.submit(_run_batch_call, i, call.get("tool"), args)] = i
+
+    aborted = None
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=deadline):
+            results[futures[future]] = future.result()
+            if fail_fast and not results[futures[future]]["ok"]:
+                aborted = "skipped: fail_fast"
+                break
+    except concurrent.futures.TimeoutError:
+        aborted = "deadline exceeded"
+
+    if aborted:
+        for future, i in futures.items():
+            if results[i] is None:
+                if not future.cancel():
+                    _batch_stragglers.add(future)
+                    future.add_done_callback(_batch_stragglers.discard)
+                results[i] = {"ok": False, "error": aborted}
+
+    for i, tool in enumerate(tools):
+        results[i] = {"index": i, "tool": tool, **results[i]}
+    failed = sum(1 for r in results if not r["ok"])
+    elapsed = _elapsed_ms(start)
+    _audit_log("batch_execute", ", ".join(str(t) for t in tools), not failed, elapsed)
+    return {
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "elapsed_ms": elapsed
+    }
+
 # === EXTERNAL APP INTEGRATION (from original) ===
 
 try:
@@ -393,8 +3565,8 @@ except ImportError:
 @mcp.tool()
 def launch_application(app_name: str) -> str:
     """Launch application by name."""
-    logger.info(f"launch_application: {app_name}")
-    _audit_log("launch_application", app_name)
+    logger.info("launch_application: %s", app_name)
+    start = time.perf_counter()
     system = platform.system()
     try:
         if system == "Windows":
@@ -403,8 +3575,10 @@ def launch_application(app_name: str) -> str:
             subprocess.Popen(["open", "-a", app_name])
         else:
             subprocess.Popen([app_name], shell=True)
+        _audit_log("launch_application", app_name, duration_ms=_elapsed_ms(start))
         return f"Launched '{app_name}'"
     except Exception as e:
+        _audit_log("launch_application", f"{app_name}: {e}", False, _elapsed_ms(start))
         return f"Error: {e}"
 
 @mcp.tool()
@@ -513,7 +3687,7 @@ def _notify(title: str, message: str):
         try:
             plyer_notif.notify(title=title, message=message, app_name='Omnis-Nexus', timeout=10)
         except Exception as e:
-            logger.error(f"Notification failed: {e}", file=sys.stderr)
+            logger.error("Notification failed: %s", e)
 
 def _get_region_hash(region):
     if not pyautogui:
@@ -522,7 +3696,7 @@ def _get_region_hash(region):
 
 def _visual_monitor_worker(name, region, interval):
     last_hash = _get_region_hash(region)
-    logger.info(f"Visual monitor '{name}' started")
+    logger.info("Visual monitor '%s' started", name)
     while ACTIVE_MONITORS.get(name):
         time.sleep(interval)
         try:
@@ -533,7 +3707,7 @@ def _visual_monitor_worker(name, region, interval):
                 _notify("Visual Alert", msg)
                 last_hash = current_hash
         except Exception as e:
-            logger.error(f"Monitor error: {e}")
+            logger.error("Monitor error: %s", e)
             break
 
 @mcp.tool()
@@ -571,7 +3745,10 @@ SCHEDULED_TASKS: Dict[str, Dict] = {}
 @mcp.tool()
 def schedule_command(task_id: str, command: str, cron_time: str) -> str:
     """Schedule a command to run at specified time (24h format HH:MM)."""
-    logger.info(f"schedule_command: {task_id} at {cron_time}")
+    logger.info("schedule_command: %s at %s", task_id, cron_time)
+    if not _validate_command(command):
+        _audit_log("schedule_command", f"BLOCKED {task_id}: {command}", False)
+        return "ERROR: Command blocked by policy"
     try:
         schedule.every().day.at(cron_time).do(lambda: os.system(command)).tag(task_id)
         SCHEDULED_TASKS[task_id] = {"command": command, "time": cron_time}
@@ -609,9 +3786,19 @@ try:
     from nexus_expansions.healers.repair_logic import HEALER_MAP
     EXPANSIONS_LOADED = True
 except ImportError as e:
-    logger.warning(f"Expansion Pack Init Failed: {e}")
+    logger.warning("Expansion Pack Init Failed: %s", e)
     EXPANSIONS_LOADED = False
 
+class ServerProxy:
+    """Tool surface handed to the voice interface and automation routines."""
+    def system_stats(self): return system_stats()
+    def launch_application(self, app): return launch_application(app)
+    def capture_screen(self): return capture_screen()
+    def notify_operator(self, t, m): return notify_operator(t, m)
+    def kill_process(self, p): return kill_process(p)
+    def kill_processes(self, targets, **kw): return kill_processes(targets, **kw)
+    def focus_window(self, t): return focus_window(t)
+
 # Global Voice Instance
 voice_interface = None
 
@@ -623,18 +3810,7 @@ def start_voice_mode() -> str:
         return "Expansion pack not loaded."
         
     if not voice_interface:
-        # Pass self (the mcp instance proxy)?? 
-        # Actually NexusVoice expects 'server_instance' to call tools directly.
-        # Since we are inside the server, we can pass a proxy object or refactor NexusVoice to call mcp tools.
-        # For simplicity, we'll wrap current mcp tools in a simple class proxy.
-        class ServerProxy:
-            def system_stats(self): return system_stats()
-            def launch_application(self, app): return launch_application(app)
-            def capture_screen(self): return capture_screen()
-            def notify_operator(self, t, m): return notify_operator(t, m)
-            def kill_process(self, p): return kill_process(p)
-            def focus_window(self, t): return focus_window(t)
-            
+        # NexusVoice calls tools directly on the object it is given.
         voice_interface = NexusVoice(ServerProxy())
         
     voice_interface.start()
@@ -652,11 +3828,11 @@ def run_automation(routine_name: str) -> str:
     """Runs a predefined automation: 'morning', 'deep_work'."""
     if not EXPANSIONS_LOADED: return "Expansion pack missing."
     
-    if routine_name == "morning":
-        threading.Thread(target=lambda: run_morning_routine(voice_interface.server if voice_interface else None)).start() # simplified
-        # Re-using the ServerProxy from voice if available, else need new one.
-        # Let's fix the circular dep by making the proxy global or creating a fresh one.
-        
+    routines = {"morning": run_morning_routine, "deep_work": run_deep_work}
+    if routine_name not in routines:
+        return f"Unknown automation '{routine_name}'."
+    proxy = voice_interface.server if voice_interface else ServerProxy()
+    threading.Thread(target=routines[routine_name], args=(proxy,), daemon=True).start()
     return f"Automation '{routine_name}' trigger sent."
 
 # === MAIN ===
@@ -664,4 +3840,8 @@ def run_automation(routine_name: str) -> str:
 if __name__ == "__main__":
     print(f"Omnis-Nexus Enhanced (v2.1) starting on {platform.system()}...", file=sys.stderr)
     print(f"SAFE_ZONE: {SAFE_ZONE}", file=sys.stderr)
+    if CONFIG.get("index_enabled", True):
+        _get_content_index()
+    TELEMETRY.start()
+    PROCESS_TABLE.start()
     mcp.run()
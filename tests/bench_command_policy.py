@@ -0,0 +1,37 @@
+"""Micro-benchmark: command policy checks stay sub-millisecond with thousands of patterns."""
+import sys
+import time
+import random
+import string
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+def _random_pattern(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12))) + " -" + rng.choice("xyzqw")
+
+def bench(pattern_count: int, iterations: int = 2000) -> None:
+    rng = random.Random(pattern_count)
+    server.CONFIG["command_whitelist_enabled"] = False
+    server.CONFIG["blocked_commands"] = [_random_pattern(rng) for _ in range(pattern_count)]
+
+    start = time.perf_counter()
+    server._get_policy()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    commands = [
+        "git status && make -j8 build | tee build.log",
+        "ls -la /var/log; cat syslog | grep error",
+        "python -m pytest -q tests/ --maxfail=1",
+    ]
+    start = time.perf_counter()
+    for i in range(iterations):
+        server._validate_command(commands[i % len(commands)])
+    per_check_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{pattern_count:>6} patterns: compile {compile_ms:8.1f} ms, check {per_check_us:7.1f} us")
+
+if __name__ == "__main__":
+    for n in (10, 1000, 5000, 20000):
+        bench(n)
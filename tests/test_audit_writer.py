@@ -0,0 +1,97 @@
+import sys
+import gzip
+import json
+import time
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class SlowAuditWriter(server.AuditWriter):
+    def _write(self, batch):
+        time.sleep(0.2)
+        super()._write(batch)
+
+class TestAuditWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "audit.jsonl"
+        self.saved = {k: server.CONFIG.get(k) for k in
+                      ("audit_queue_size", "audit_overflow", "audit_flush_interval", "audit_max_bytes",
+                       "audit_details_max")}
+        server.CONFIG["audit_flush_interval"] = 0.05
+        self.saved_writer = (server.AUDIT_WRITER, server.AUDIT_LOG)
+        server.AUDIT_LOG = self.path
+        server.AUDIT_WRITER = server.AuditWriter(self.path)
+
+    def tearDown(self):
+        server.AUDIT_WRITER.flush()
+        server.AUDIT_WRITER, server.AUDIT_LOG = self.saved_writer
+        server.CONFIG.update(self.saved)
+        self.tmp.cleanup()
+
+    def last_record(self):
+        server.AUDIT_WRITER.flush()
+        return json.loads(self.path.read_text().splitlines()[-1])
+
+    def test_jsonl_records(self):
+        writer = server.AuditWriter(self.path)
+        writer.submit({"action": "run_command", "success": True, "details": "ls"})
+        writer.submit({"action": "kill_process", "success": False, "details": "42"})
+        writer.flush()
+        records = [json.loads(line) for line in self.path.read_text().splitlines()]
+        self.assertEqual([r["action"] for r in records], ["run_command", "kill_process"])
+        self.assertEqual(writer.status()["written"], 2)
+
+    def test_audit_log_record_shape(self):
+        server._audit_log("write_file", "/tmp/x", duration_ms=1.5)
+        last = self.last_record()
+        self.assertEqual(last["action"], "write_file")
+        self.assertEqual(last["duration_ms"], 1.5)
+        self.assertEqual(len(last["digest"]), 16)
+        self.assertNotIn("details_truncated", last)
+
+    def test_long_details_keep_preview_and_full_digest(self):
+        server.CONFIG["audit_details_max"] = 64
+        details = "echo " + "x" * 5000
+        server._audit_log("run_command", details)
+        last = self.last_record()
+        self.assertEqual(last["details"], details[:64])
+        self.assertTrue(last["details_truncated"])
+        self.assertEqual(last["digest"], server.hashlib.sha256(details.encode()).hexdigest()[:16])
+
+    def test_tool_records_are_timed(self):
+        server.run_command("echo audited")
+        last = self.last_record()
+        self.assertEqual(last["action"], "run_command")
+        self.assertTrue(last["success"])
+        self.assertIsInstance(last["duration_ms"], float)
+
+    def test_rotation_compresses_segments(self):
+        server.CONFIG["audit_max_bytes"] = 2000
+        writer = server.AuditWriter(self.path)
+        for i in range(200):
+            writer.submit({"action": "a", "details": "x" * 50, "i": i})
+        writer.flush()
+        segments = sorted(Path(self.tmp.name).glob("audit.jsonl.*.gz"))
+        self.assertGreaterEqual(writer.rotations, 1)
+        with gzip.open(segments[0], "rt") as f:
+            self.assertEqual(json.loads(f.readline())["i"], 0)
+
+    def test_drop_policy_counts(self):
+        server.CONFIG["audit_queue_size"] = 2
+        server.CONFIG["audit_overflow"] = "drop"
+        writer = SlowAuditWriter(self.path)
+        for i in range(50):
+            writer.submit({"action": "a", "i": i})
+        writer.flush()
+        status = writer.status()
+        self.assertGreater(status["dropped"], 0)
+        self.assertEqual(status["written"] + status["dropped"], 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import tempfile
+import time
+import platform
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestBatchExecute(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        server.SAFE_ZONE = Path(self.tmp.name).resolve()
+        server.CONFIG["command_whitelist_enabled"] = False
+        server.CONFIG["blocked_commands"] = ["rm -rf", "del /s", "format"]
+        (server.SAFE_ZONE / "a.txt").write_text("alpha")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_independent_slots(self):
+        out = server.batch_execute([
+            {"tool": "read_file", "args": {"path": str(server.SAFE_ZONE / "a.txt")}},
+            {"tool": "read_file", "args": {"path": "/etc/hostname"}},
+            {"tool": "get_config", "args": {"key": "audit_enabled"}},
+            {"tool": "set_clipboard", "args": {"content": "x"}},
+        ])
+        results = out["results"]
+        self.assertEqual(results[0]["result"], "alpha")
+        self.assertFalse(results[1]["ok"])
+        self.assertIn("RESTRICTED", results[1]["result"])
+        self.assertTrue(results[2]["ok"])
+        self.assertIn("cannot be batched", results[3]["error"])
+        self.assertEqual(out["succeeded"], 2)
+
+    @unittest.skipIf(platform.system() == "Windows", "POSIX shell syntax")
+    def test_policy_and_deadline(self):
+        out = server.batch_execute([
+            {"tool": "run_command", "args": {"command": "rm -rf /"}},
+            {"tool": "run_command", "args": {"command": "sleep 3"}},
+        ], deadline=1)
+        self.assertIn("blocked", out["results"][0]["result"])
+        self.assertEqual(out["results"][1]["error"], "deadline exceeded")
+
+    def test_bad_arguments(self):
+        out = server.batch_execute([{"tool": "read_file", "args": {"nope": 1}}])
+        self.assertIn("TypeError", out["results"][0]["error"])
+
+    def test_non_object_call(self):
+        out = server.batch_execute(["read_file", {"tool": "get_config", "args": {"key": "audit_enabled"}}])
+        self.assertEqual(out["results"][0]["error"], "call must be an object")
+        self.assertIsNone(out["results"][0]["tool"])
+        self.assertTrue(out["results"][1]["ok"])
+
+    @unittest.skipIf(platform.system() == "Windows", "POSIX shell syntax")
+    def test_stragglers_limit_new_batches(self):
+        def drain():
+            deadline = time.time() + 5
+            while server._batch_stragglers and time.time() < deadline:
+                time.sleep(0.05)
+
+        drain()  # earlier deadline tests may still hold a worker
+        workers = server.CONFIG.get("batch_max_workers", 8)
+        server.CONFIG["batch_max_workers"] = 1
+        try:
+            out = server.batch_execute([{"tool": "run_command", "args": {"command": "sleep 1"}}], deadline=0.1)
+            self.assertEqual(out["results"][0]["error"], "deadline exceeded")
+            self.assertIn("busy", server.batch_execute([{"tool": "get_config"}])["error"])
+            drain()
+            self.assertTrue(server.batch_execute([{"tool": "get_config"}])["results"][0]["ok"])
+        finally:
+            server.CONFIG["batch_max_workers"] = workers
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestContentIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name).resolve()
+        self.root = base / "zone"
+        self.root.mkdir()
+        server.SAFE_ZONE = self.root
+        self.saved_index = server.CONTENT_INDEX
+        server.CONTENT_INDEX = self.index = server.ContentIndex(base / "index" / "content.db")
+        (self.root / "a.py").write_text("def connect_database():\n    pass\n")
+        (self.root / "b.py").write_text("def close():\n    return None\n")
+        (self.root / "c.txt").write_text("Connect later\n")
+        self.index.scan(self.root)
+
+    def tearDown(self):
+        server.CONTENT_INDEX = self.saved_index
+        self.index.db.close()
+        self.tmp.cleanup()
+
+    def test_substring_query_is_narrowed(self):
+        result = server.query_index("connect_data")
+        self.assertTrue(result["narrowed_by_index"])
+        self.assertEqual(result["candidates"], 1)
+        self.assertEqual(result["results"][0]["file"], "a.py")
+        self.assertEqual(result["results"][0]["matches"][0]["line"], 1)
+
+    def test_case_and_regex(self):
+        files = {r["file"] for r in server.query_index("connect", ignore_case=True)["results"]}
+        self.assertEqual(files, {"a.py", "c.txt"})
+        result = server.query_index(r"def \w+\(\):\s+return", regex=True)
+        self.assertEqual({r["file"] for r in result["results"]}, {"b.py"})
+
+    def test_incremental_updates(self):
+        (self.root / "b.py").write_text("def connect_database_pool():\n    pass\n")
+        (self.root / "c.txt").unlink()
+        self.index.scan(self.root)
+        self.assertEqual(self.index.state["files_updated"], 1)
+        self.assertEqual(self.index.state["files_removed"], 1)
+        files = {r["file"] for r in server.query_index("connect_database")["results"]}
+        self.assertEqual(files, {"a.py", "b.py"})
+        self.assertEqual(server.index_status()["files_indexed"], 2)
+
+    def test_regex_literals(self):
+        self.assertEqual(server._regex_literals(r"foo\.bar\d+baz"), ["foo.bar", "baz"])
+        self.assertEqual(server._regex_literals(r"colou?r_name"), ["colo", "r_name"])
+        self.assertEqual(server._regex_literals(r"(abc)?def"), [])
+        self.assertEqual(server._regex_literals(r"cat|dog"), [])
+        self.assertEqual(server._regex_literals(r"(?!foo)bar"), ["bar"])
+        self.assertEqual(server._regex_literals(r"abc(?<=x(y)z)def"), ["abc", "def"])
+
+    def test_lookaround_does_not_drop_files(self):
+        result = server.query_index(r"(?<!xx)connect_database", regex=True)
+        self.assertEqual({r["file"] for r in result["results"]}, {"a.py"})
+
+    def test_unindexed_files_are_scanned(self):
+        limit = server.CONFIG.get("index_max_file_bytes")
+        server.CONFIG["index_max_file_bytes"] = 64
+        try:
+            (self.root / "big.py").write_text("x = 1\n" * 20 + "connect_database = None\n")
+            self.index.scan(self.root)
+            (self.root / "new.py").write_text("connect_database()\n")
+            result = server.query_index("connect_database", fresh=True)
+            self.assertTrue(result["complete"])
+            self.assertEqual({r["file"] for r in result["results"]}, {"a.py", "big.py", "new.py"})
+            stale = server.query_index("connect_database")
+            self.assertFalse(stale["complete"])
+            self.assertIsNotNone(stale["index_last_scan"])
+            self.assertEqual({r["file"] for r in stale["results"]}, {"a.py", "big.py"})
+        finally:
+            server.CONFIG["index_max_file_bytes"] = limit
+
+    def test_match_cap_stops_scanning(self):
+        for i in range(400):
+            (self.root / f"gen{i:03d}.py").write_text("connect_database()\n")
+        self.index.scan(self.root)
+        result = server.query_index("connect_database", max_matches=5)
+        self.assertEqual(result["total_matches"], 5)
+        self.assertTrue(result["truncated"])
+        self.assertLess(result["files_scanned"], result["candidates"])
+
+if __name__ == '__main__':
+    unittest.main()
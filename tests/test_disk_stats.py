@@ -0,0 +1,109 @@
+import sys
+import time
+import threading
+import unittest
+from collections import namedtuple
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+Part = namedtuple("Part", "device mountpoint fstype")
+Usage = namedtuple("Usage", "total used free percent")
+PARTS = [Part("/dev/a", "/a", "ext4"), Part("nfs:/b", "/b", "nfs")]
+
+class TestDiskProber(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.prober = server.DiskProber()
+        server.CONFIG["disk_probe_timeout"] = 0.3
+        patches = [
+            mock.patch.object(server.psutil, "disk_partitions", side_effect=lambda: self.calls.append(1) or PARTS),
+            mock.patch.object(server.psutil, "disk_usage", side_effect=self.usage),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.release.set()
+        server.CONFIG["disk_probe_timeout"] = server.DEFAULT_CONFIG["disk_probe_timeout"]
+        server.CONFIG["disk_probe_workers"] = server.DEFAULT_CONFIG["disk_probe_workers"]
+
+    def usage(self, mountpoint):
+        if mountpoint == "/b":
+            self.release.wait(10)
+        return Usage(2**30, 2**29, 2**29, 50.0)
+
+    def test_hung_mount_does_not_block(self):
+        start = time.perf_counter()
+        result = self.prober.get(max_age=0)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual([r["status"] for r in result], ["ok", "hung"])
+        self.assertEqual(result[0]["percent"], 50.0)
+        # the stuck probe is not resubmitted while it is still running
+        self.prober.get(max_age=0)
+        self.assertEqual(server.psutil.disk_usage.call_args_list.count(mock.call("/b")), 1)
+        self.release.set()
+        time.sleep(0.1)
+        self.assertEqual([r["status"] for r in self.prober.get(max_age=0)], ["ok", "ok"])
+
+    def test_stuck_workers_retire_the_pool(self):
+        server.CONFIG["disk_probe_workers"] = 1
+        self.assertEqual([r["status"] for r in self.prober.get(max_age=0)], ["ok", "hung"])
+        # The only worker is stuck on /b; /a must not queue behind it.
+        self.assertEqual([r["status"] for r in self.prober.get(max_age=0)], ["ok", "hung"])
+        self.assertEqual(len(self.prober.retired), 1)
+        self.release.set()
+        time.sleep(0.1)
+        self.assertEqual(len(self.prober.retired), 0)
+
+    def test_skips_probes_past_stuck_limit(self):
+        server.CONFIG["disk_probe_workers"] = 1
+        with mock.patch.object(server, "DISK_PROBE_MAX_STUCK", 1):
+            self.prober.get(max_age=0)
+            result = self.prober.get(max_age=0)
+        self.assertEqual([r["status"] for r in result], ["skipped", "hung"])
+        self.assertNotIn("total_gb", result[0])
+
+    def test_unmounted_pending_is_dropped(self):
+        self.prober.get(max_age=0)
+        self.assertIn("/b", self.prober.pending)
+        with mock.patch.object(server.psutil, "disk_partitions", return_value=PARTS[:1]), \
+                mock.patch.object(self.prober, "_mount_signature", return_value=42):
+            self.assertEqual([r["mountpoint"] for r in self.prober.get(max_age=0)], ["/a"])
+        self.assertEqual(list(self.prober.pending), [])
+        self.assertEqual(len(self.prober.stuck), 1)
+
+    def test_concurrent_callers_share_probe(self):
+        self.release.set()
+        threads = [threading.Thread(target=self.prober.get) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.prober.probes, 1)
+
+    def test_partitions_follow_mountinfo(self):
+        self.release.set()
+        sig = [1]
+        with mock.patch.object(self.prober, "_mount_signature", side_effect=lambda: sig[0]):
+            self.prober.get(max_age=0)
+            self.prober.get(max_age=0)
+            self.assertEqual(len(self.calls), 1)
+            sig[0] = 2
+            self.prober.get(max_age=0)
+            self.assertEqual(len(self.calls), 2)
+
+class TestDiskStatsTool(unittest.TestCase):
+    def test_shape(self):
+        for part in server.disk_stats():
+            self.assertIn(part["status"], ("ok", "hung", "skipped", "error"))
+            self.assertIn("mountpoint", part)
+
+if __name__ == '__main__':
+    unittest.main()
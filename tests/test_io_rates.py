@@ -0,0 +1,87 @@
+import sys
+import time
+import unittest
+from collections import namedtuple
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+Net = namedtuple("Net", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+Disk = namedtuple("Disk", "read_count write_count read_bytes write_bytes busy_time")
+
+class TestIoRates(unittest.TestCase):
+    def setUp(self):
+        self.sampler = server.TelemetrySampler()
+        for t in range(0, 61, 2):
+            self.sampler._record_io(1000.0 + t,
+                                    {"eth0": Net(100 * t, 1000 * t, t, 10 * t, 0, 0, t // 10, 0)},
+                                    {"sda": Disk(5 * t, 2 * t, 4096 * t, 0, 250 * t)})
+
+    def test_window_selection(self):
+        elapsed, _, rates = self.sampler.io_rates(1, 10)
+        self.assertEqual(elapsed, 10)
+        self.assertEqual(rates["eth0"]["bytes_sent"], 100)
+        self.assertEqual(rates["eth0"]["bytes_recv"], 1000)
+        elapsed, _, _ = self.sampler.io_rates(1, 10_000)
+        self.assertEqual(elapsed, 60)  # clamped to retained history
+
+    def test_zero_window_uses_previous_sample(self):
+        elapsed, _, rates = self.sampler.io_rates(1, 0)
+        self.assertEqual(elapsed, 2)
+        self.assertEqual(rates["eth0"]["bytes_sent"], 100)
+
+    def test_samples_at_one_instant_have_no_rate(self):
+        sampler = server.TelemetrySampler()
+        for _ in range(2):
+            sampler._record_io(1000.0, {"eth0": Net(0, 0, 0, 0, 0, 0, 0, 0)}, {})
+        self.assertIsNone(sampler.io_rates(1, 10))
+
+    def test_disk_rates(self):
+        _, _, rates = self.sampler.io_rates(2, 30)
+        self.assertEqual(rates["sda"]["read_count"], 5)
+        self.assertEqual(rates["sda"]["read_bytes"], 4096)
+        self.assertEqual(rates["sda"]["busy_time"], 250)
+
+    def test_counter_reset_is_clamped(self):
+        self.sampler._record_io(1062.0, {"eth0": Net(0, 0, 0, 0, 0, 0, 0, 0)}, {})
+        _, _, rates = self.sampler.io_rates(1, 2)
+        self.assertEqual(rates["eth0"]["bytes_sent"], 0)
+
+    def test_history_is_bounded(self):
+        server.CONFIG["io_rate_history"] = 10
+        try:
+            self.sampler._record_io(1062.0, {}, {})
+        finally:
+            server.CONFIG["io_rate_history"] = server.DEFAULT_CONFIG["io_rate_history"]
+        self.assertLessEqual(self.sampler.io_samples[-1][0] - self.sampler.io_samples[0][0], 12)
+
+class TestIoRateTools(unittest.TestCase):
+    def setUp(self):
+        server.TELEMETRY.get(timeout=5)
+        server.TELEMETRY.wakeup.set()
+        deadline = time.time() + 5
+        while len(server.TELEMETRY.io_samples) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+
+    def test_network_rates(self):
+        start = time.perf_counter()
+        result = server.network_rates("1m")
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertIn("interfaces", result)
+        for nic in result["interfaces"].values():
+            self.assertGreaterEqual(nic["recv_bytes_per_s"], 0)
+        self.assertIn("error", server.network_rates(interface="no-such-nic"))
+        self.assertIn("error", server.network_rates("forever"))
+
+    def test_disk_io_rates(self):
+        result = server.disk_io_rates(30)
+        self.assertIn("disks", result)
+        for disk in result["disks"].values():
+            self.assertIn("read_iops", disk)
+        self.assertIn("error", server.disk_io_rates(0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import sys
+import time
+import platform
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+def _wait(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = server.job_status(job_id)
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+@unittest.skipIf(platform.system() == "Windows", "POSIX shell syntax")
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        server.CONFIG["command_whitelist_enabled"] = False
+        server.CONFIG["blocked_commands"] = ["rm -rf", "del /s", "format"]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_dirs = server.JOB_DIR, server.OUTPUT_DIR
+        server.JOB_DIR = Path(self.tmp.name) / "jobs"
+        server.OUTPUT_DIR = Path(self.tmp.name) / "command_output"
+        server.JOB_DIR.mkdir()
+        server.OUTPUT_DIR.mkdir()
+
+    def tearDown(self):
+        server.JOB_DIR, server.OUTPUT_DIR = self.saved_dirs
+        self.tmp.cleanup()
+
+    def test_job_lifecycle(self):
+        job = server.submit_job("echo out; echo err >&2; exit 2")
+        status = _wait(job["job_id"])
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["exit_code"], 2)
+        page = server.job_output(job["job_id"])
+        self.assertEqual(page["data"], "out\n")
+        self.assertTrue(page["eof"])
+        self.assertEqual(server.job_output(job["job_id"], "stderr")["data"], "err\n")
+
+    def test_output_offset(self):
+        job = server.submit_job("printf abcdef")
+        _wait(job["job_id"])
+        self.assertEqual(server.job_output(job["job_id"], offset=2, limit=3)["data"], "cde")
+
+    def test_output_survives_spill_prune(self):
+        job = server.submit_job("echo kept")
+        _wait(job["job_id"])
+        for i in range(5):
+            (server.OUTPUT_DIR / f"{i:032x}.stdout").write_text("spill")
+        retention = server.CONFIG.get("output_spill_retention", 50)
+        server.CONFIG["output_spill_retention"] = 1
+        try:
+            server._prune_output_dir()
+        finally:
+            server.CONFIG["output_spill_retention"] = retention
+        self.assertEqual(len(list(server.OUTPUT_DIR.iterdir())), 2)
+        self.assertEqual(server.job_output(job["job_id"])["data"], "kept\n")
+
+    def test_cancel_and_timeout(self):
+        running = server.submit_job("sleep 30")
+        timed = server.submit_job("sleep 30", timeout=1)
+        time.sleep(0.3)
+        server.cancel_job(running["job_id"])
+        self.assertEqual(_wait(running["job_id"])["status"], "cancelled")
+        self.assertEqual(_wait(timed["job_id"])["status"], "timed_out")
+
+    def test_job_published_after_future(self):
+        visible = []
+        schedule = server.asyncio.run_coroutine_threadsafe
+
+        def spy(coro, loop):
+            visible.extend(server.JOBS)
+            return schedule(coro, loop)
+
+        with mock.patch.object(server.asyncio, "run_coroutine_threadsafe", side_effect=spy):
+            job = server.submit_job("true")
+        self.assertNotIn(job["job_id"], visible)
+        self.assertIsNotNone(server.JOBS[job["job_id"]].future)
+        _wait(job["job_id"])
+
+    def test_blocked_and_listing(self):
+        self.assertIn("error", server.submit_job("rm -rf /"))
+        job = server.submit_job("true")
+        _wait(job["job_id"])
+        ids = [j["job_id"] for j in server.list_jobs(status="succeeded")]
+        self.assertIn(job["job_id"], ids)
+
+if __name__ == '__main__':
+    unittest.main()
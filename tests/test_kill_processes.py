@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import subprocess
+import unittest
+import psutil
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+SLEEPER = "import time; time.sleep(30)"
+STUBBORN = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)"
+PARENT = ("import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+          "time.sleep(30)")
+
+class FakeProc:
+    def __init__(self, pid, name, ppid, create_time):
+        self.pid = pid
+        self.info = {"pid": pid, "name": name, "ppid": ppid, "create_time": create_time}
+        self.signalled = False
+
+    def terminate(self):
+        self.signalled = True
+
+    kill = terminate
+
+class TestKillProcesses(unittest.TestCase):
+    def setUp(self):
+        self.children = []
+
+    def tearDown(self):
+        for child in self.children:
+            child.kill()
+            child.wait()
+
+    def spawn(self, code):
+        child = subprocess.Popen([sys.executable, "-c", code])
+        self.children.append(child)
+        return child
+
+    def test_multiple_pids_one_call(self):
+        a, b = self.spawn(SLEEPER), self.spawn(SLEEPER)
+        result = server.kill_processes([a.pid, str(b.pid), 999999999], timeout=3)
+        statuses = [t["status"] for t in result["targets"]]
+        self.assertEqual(statuses, ["ok", "ok", "not_found"])
+        self.assertEqual(result["targets"][0]["terminated"], [a.pid])
+        self.assertIsNotNone(a.wait(timeout=1))
+        self.assertIsNotNone(b.wait(timeout=1))
+
+    def test_escalates_to_kill(self):
+        child = self.spawn(STUBBORN)
+        time.sleep(0.3)
+        result = server.kill_processes([child.pid], timeout=0.5)
+        self.assertEqual(result["targets"][0]["killed"], [child.pid])
+        self.assertIsNotNone(child.wait(timeout=1))
+
+    def test_tree(self):
+        parent = self.spawn(PARENT)
+        time.sleep(0.5)
+        grandchild = psutil.Process(parent.pid).children()[0].pid
+        result = server.kill_processes([parent.pid], tree=True, timeout=3)
+        self.assertEqual(sorted(result["targets"][0]["matched"]), sorted([parent.pid, grandchild]))
+        self.assertFalse(psutil.pid_exists(grandchild) and psutil.Process(grandchild).status() != "zombie")
+
+    def test_never_kills_self(self):
+        result = server.kill_processes([os.getpid(), 999999999])
+        self.assertEqual([t["status"] for t in result["targets"]], ["protected", "not_found"])
+        self.assertEqual(result["targets"][0]["protected"], [os.getpid()])
+        self.assertIn("error", server.kill_processes(["("], regex=True))
+
+    def test_too_broad_patterns_are_invalid(self):
+        result = server.kill_processes(["", "py"], timeout=0)
+        self.assertEqual([t["status"] for t in result["targets"]], ["invalid", "invalid"])
+        self.assertEqual(result["matched"], 0)
+        result = server.kill_processes([".*"], regex=True, timeout=0)
+        self.assertEqual(result["targets"][0]["status"], "invalid")
+
+    def test_never_kills_ancestors(self):
+        with mock.patch.object(psutil.Process, "terminate") as terminate, \
+                mock.patch.object(psutil.Process, "kill") as kill:
+            result = server.kill_processes([os.getppid()], timeout=0)
+        self.assertEqual(result["targets"][0]["status"], "protected")
+        self.assertEqual(result["targets"][0]["protected"], [os.getppid()])
+        terminate.assert_not_called()
+        kill.assert_not_called()
+
+    def test_tree_skips_recycled_ppid(self):
+        parent = FakeProc(900001, "target", 1, 100.0)
+        child = FakeProc(900002, "child", 900001, 101.0)
+        stale = FakeProc(900003, "unrelated", 900001, 50.0)  # older than its "parent"
+        table = [parent, child, stale]
+        with mock.patch.object(server.psutil, "process_iter", return_value=table), \
+                mock.patch.object(server.psutil, "wait_procs", side_effect=lambda procs, timeout: (procs, [])):
+            result = server.kill_processes([parent.pid], tree=True, timeout=0)
+        self.assertEqual(sorted(result["targets"][0]["matched"]), [parent.pid, child.pid])
+        self.assertFalse(stale.signalled)
+
+if __name__ == '__main__':
+    unittest.main()
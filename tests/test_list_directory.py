@@ -0,0 +1,89 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestListDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for i in range(25):
+            (self.root / f"file{i:02d}.txt").write_text("x" * i)
+        (self.root / "sub" / "deep").mkdir(parents=True)
+        (self.root / "sub" / "a.py").write_text("print()")
+        (self.root / "sub" / "deep" / "b.py").write_text("pass")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flat_listing(self):
+        result = server.list_directory(self.tmp.name)
+        self.assertEqual(result["total"], 26)
+        self.assertIsNone(result["next_page_token"])
+        sub = next(e for e in result["entries"] if e["name"] == "sub")
+        self.assertTrue(sub["is_dir"])
+        self.assertIsNone(sub["size"])
+
+    def test_recursion_and_filters(self):
+        names = {e["name"] for e in server.list_directory(self.tmp.name, max_depth=1, extensions=["py"])["entries"]}
+        self.assertEqual(names, {"sub/a.py"})
+        names = {e["name"] for e in server.list_directory(self.tmp.name, max_depth=5, pattern="*.py")["entries"]}
+        self.assertEqual(names, {"sub/a.py", "sub/deep/b.py"})
+
+    def test_sorted_pagination(self):
+        seen, token = [], None
+        while True:
+            page = server.list_directory(self.tmp.name, pattern="*.txt", sort_by="size",
+                                         descending=True, limit=10, page_token=token)
+            seen.extend(e["size"] for e in page["entries"])
+            token = page["next_page_token"]
+            if not token:
+                break
+        self.assertEqual(seen, list(range(24, -1, -1)))
+
+    def test_unsorted_pages_stream(self):
+        names, token, cache_size = [], None, len(server._listing_cache)
+        walks = []
+        iter_listing = server._iter_listing
+        with mock.patch.object(server, "_iter_listing",
+                               side_effect=lambda *a: walks.append(a) or iter_listing(*a)):
+            while True:
+                page = server.list_directory(self.tmp.name, limit=10, page_token=token)
+                names.extend(e["name"] for e in page["entries"])
+                token = page["next_page_token"]
+                if not token:
+                    break
+                self.assertIsNone(page["total"])
+        self.assertEqual(len(walks), 1)  # later pages resume the first walk
+        self.assertEqual(page["total"], 26)
+        self.assertEqual(len(set(names)), 26)
+        self.assertEqual(len(server._listing_cache), cache_size)
+
+    def test_unsorted_token_is_single_use(self):
+        first = server.list_directory(self.tmp.name, limit=10)
+        token = first["next_page_token"]
+        second = server.list_directory(self.tmp.name, limit=10, page_token=token)
+        self.assertEqual(second["offset"], 10)
+        self.assertIn("error", server.list_directory(self.tmp.name, limit=10, page_token=token))
+
+    def test_evicted_walks_are_closed(self):
+        tokens = [server.list_directory(self.tmp.name, limit=1)["next_page_token"]
+                  for _ in range(server.LISTING_CURSORS + 1)]
+        self.assertLessEqual(len(server._listing_cursors), server.LISTING_CURSORS)
+        self.assertIn("error", server.list_directory(self.tmp.name, limit=1, page_token=tokens[0]))
+
+    def test_columnar_and_token_mismatch(self):
+        page = server.list_directory(self.tmp.name, limit=5, columnar=True)
+        self.assertEqual(page["columns"], ["name", "is_dir", "size", "mtime"])
+        self.assertEqual(len(page["rows"]), 5)
+        other = server.list_directory(self.tmp.name, pattern="*.py", page_token=page["next_page_token"])
+        self.assertIn("error", other)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import sys
+import queue
+import logging
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestLoggingPipeline(unittest.TestCase):
+    def test_no_synchronous_file_handler(self):
+        handlers = server.logger.handlers
+        self.assertTrue(any(isinstance(h, server.DroppingQueueHandler) for h in handlers))
+        self.assertFalse(any(isinstance(h, logging.FileHandler) for h in handlers))
+
+    def test_rate_limit_debug(self):
+        limiter = server.RateLimitFilter(rate=3, window=60)
+        record = lambda level: logging.LogRecord("OmnisNexus", level, __file__, 1, "read_file: %s", ("x",), None)
+        passed = [limiter.filter(record(logging.DEBUG)) for _ in range(10)]
+        self.assertEqual(passed.count(True), 3)
+        self.assertEqual(limiter.suppressed, 7)
+        self.assertTrue(limiter.filter(record(logging.WARNING)))
+
+    def test_full_queue_drops(self):
+        handler = server.DroppingQueueHandler(queue.Queue(maxsize=1))
+        for _ in range(3):
+            handler.enqueue(logging.LogRecord("x", logging.INFO, __file__, 1, "m", None, None))
+        self.assertEqual(handler.dropped, 2)
+
+    def test_runtime_levels(self):
+        original = server.logger.level
+        try:
+            server.set_log_level("warning")
+            self.assertEqual(server.get_log_levels()["levels"]["OmnisNexus"], "WARNING")
+            self.assertFalse(server.logger.isEnabledFor(logging.DEBUG))
+            self.assertIn("Error", server.set_log_level("LOUD"))
+        finally:
+            server.logger.setLevel(original)
+
+if __name__ == '__main__':
+    unittest.main()
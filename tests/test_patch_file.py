@@ -0,0 +1,94 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+DIFF = """--- a/f.txt
++++ b/f.txt
+@@ -2,3 +2,3 @@
+ two
+-three
++THREE
+ four
+@@ -8,0 +9,2 @@
++eight-and-a-half
++eight-and-three-quarters
+"""
+
+class TestPatchFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name).resolve()
+        server.SAFE_ZONE = root
+        self.saved_store = server.ROLLBACK_STORE
+        server.ROLLBACK_STORE = server.RollbackStore(root / ".rollback")
+        self.path = root / "f.txt"
+        self.original = "".join(f"{w}\n" for w in
+                                ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"])
+        self.path.write_text(self.original)
+
+    def tearDown(self):
+        server.ROLLBACK_STORE.db.close()
+        server.ROLLBACK_STORE = self.saved_store
+        self.tmp.cleanup()
+
+    def test_unified_diff(self):
+        self.assertIn("2 hunks", server.patch_file(str(self.path), diff=DIFF))
+        lines = self.path.read_text().splitlines()
+        self.assertEqual(lines[2], "THREE")
+        self.assertEqual(lines[8:11], ["eight-and-a-half", "eight-and-three-quarters", "nine"])
+        self.assertEqual(len(server.list_rollbacks(str(self.path))), 1)
+
+    @unittest.skipIf(sys.platform == "win32", "symlinks need privileges on Windows")
+    def test_writes_follow_symlinks(self):
+        link = self.path.with_name("link.txt")
+        link.symlink_to(self.path)
+        server.write_file(str(link), "one\n")
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(self.path.read_text(), "one\n")
+        server.patch_file(str(link), edits=[{"search": "one", "replace": "uno"}])
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(self.path.read_text(), "uno\n")
+
+    def test_patch_missing_file_creates_nothing(self):
+        missing = self.path.parent / "newdir" / "f.txt"
+        self.assertIn("Error", server.patch_file(str(missing), edits=[{"search": "x"}]))
+        self.assertFalse(missing.parent.exists())
+
+    def test_mismatch_leaves_file_untouched(self):
+        bad = DIFF.replace("-three", "-tree")
+        self.assertIn("mismatch", server.patch_file(str(self.path), diff=bad))
+        self.assertEqual(self.path.read_text(), self.original)
+        self.assertEqual(list(self.path.parent.glob(".*.tmp")), [])
+
+    def test_search_replace(self):
+        result = server.patch_file(str(self.path), edits=[
+            {"search": "two\nthree", "replace": "2\n3"},
+            {"search": "ne\n", "replace": "NE\n", "count": 0},
+        ])
+        self.assertIn("2 edits", result)
+        self.assertEqual(self.path.read_text().split(), ["oNE", "2", "3", "four", "five", "six", "seven", "eight", "niNE"])
+
+    def test_overlapping_edits_rejected(self):
+        result = server.patch_file(str(self.path), edits=[{"search": "two\nthree"}, {"search": "ee\nfour"}])
+        self.assertIn("overlap", result)
+
+    def test_search_count_enforced(self):
+        self.assertIn("matched 0 times", server.patch_file(str(self.path), edits=[{"search": "zzz"}]))
+        self.assertIn("matched 4 times",
+                      server.patch_file(str(self.path), edits=[{"search": "e\n", "replace": ""}]))
+        self.assertEqual(self.path.read_text(), self.original)
+
+    def test_write_file_is_atomic_and_keeps_rollback(self):
+        server.write_file(str(self.path), "new")
+        self.assertEqual(self.path.read_text(), "new")
+        self.assertEqual(list(self.path.parent.glob(".*.tmp")), [])
+        self.assertEqual(len(server.list_rollbacks(str(self.path))), 1)
+
+if __name__ == '__main__':
+    unittest.main()
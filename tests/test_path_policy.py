@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestPathPolicy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name).resolve()
+        self.zone, self.outside, self.extra = base / "zone", base / "outside", base / "extra"
+        for d in (self.zone / "secrets", self.outside, self.extra):
+            d.mkdir(parents=True)
+        server.SAFE_ZONE = self.zone
+        server.CONFIG["allow_roots"] = []
+        server.CONFIG["deny_roots"] = []
+        server.CONFIG["deny_globs"] = []
+
+    def tearDown(self):
+        server.CONFIG["allow_roots"] = []
+        server.CONFIG["deny_roots"] = []
+        server.CONFIG["deny_globs"] = []
+        self.tmp.cleanup()
+
+    def test_basic_containment(self):
+        self.assertTrue(server._is_safe_path(self.zone / "new_file.txt"))
+        self.assertTrue(server._is_safe_path(self.zone))
+        self.assertFalse(server._is_safe_path(self.outside / "x"))
+        self.assertFalse(server._is_safe_path(str(self.zone) + "_sibling/x"))
+        self.assertFalse(server._is_safe_path(self.zone / ".." / "outside" / "x"))
+
+    @unittest.skipIf(os.name == "nt", "symlinks need privileges on Windows")
+    def test_symlink_retarget_invalidates_cache(self):
+        link = self.zone / "link"
+        link.symlink_to(self.zone / "secrets")
+        self.assertTrue(server._is_safe_path(link / "a.txt"))
+        link.unlink()
+        link.symlink_to(self.outside)
+        self.assertFalse(server._is_safe_path(link / "a.txt"))
+
+    @unittest.skipIf(os.name == "nt", "symlinks need privileges on Windows")
+    def test_moved_directory_replaced_by_symlink(self):
+        d = self.zone / "d"
+        d.mkdir()
+        (d / "secret.txt").write_text("x")
+        self.assertTrue(server._is_safe_path(d / "secret.txt"))
+        d.rename(self.outside / "d")  # same inode, now outside the zone
+        d.symlink_to(self.outside / "d")
+        allowed, resolved, _ = server._get_path_policy().check(d / "secret.txt")
+        self.assertFalse(allowed)
+        self.assertEqual(resolved, str(self.outside / "d" / "secret.txt"))
+
+    def test_in_place_deny_root_edit(self):
+        target = self.zone / "secrets" / "key"
+        self.assertTrue(server._is_safe_path(target))
+        server.CONFIG["deny_roots"].append(str(self.zone / "secrets"))
+        self.assertFalse(server._is_safe_path(target))
+
+    @unittest.skipIf(os.name == "nt", "symlinks need privileges on Windows")
+    def test_file_symlink_escape(self):
+        (self.outside / "target").write_text("x")
+        (self.zone / "escape").symlink_to(self.outside / "target")
+        self.assertFalse(server._is_safe_path(self.zone / "escape"))
+
+    def test_allow_and_deny_rules(self):
+        server.CONFIG["allow_roots"] = [str(self.extra)]
+        server.CONFIG["deny_roots"] = [str(self.zone / "secrets")]
+        server.CONFIG["deny_globs"] = ["*.pem"]
+        results = server.check_paths([
+            str(self.extra / "ok.txt"),
+            str(self.zone / "secrets" / "key"),
+            str(self.zone / "cert.pem"),
+            str(self.zone / "notes.txt"),
+        ])
+        self.assertEqual([r["allowed"] for r in results], [True, False, False, True])
+        self.assertEqual(results[1]["reason"], "inside a denied root")
+
+    def test_set_config_moves_safe_zone(self):
+        original = server.CONFIG_FILE
+        server.CONFIG_FILE = Path(self.tmp.name) / "config.json"
+        try:
+            server.set_config("safe_zone", str(self.outside))
+            self.assertTrue(server._is_safe_path(self.outside / "x"))
+            self.assertFalse(server._is_safe_path(self.zone / "x"))
+        finally:
+            server.CONFIG_FILE = original
+
+if __name__ == '__main__':
+    unittest.main()
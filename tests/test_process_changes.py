@@ -0,0 +1,62 @@
+import sys
+import time
+import subprocess
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestProcessChanges(unittest.TestCase):
+    def test_cursor_flow(self):
+        first = server.process_changes()
+        self.assertTrue(first["reset"])
+        self.assertGreater(len(first["started"]), 1)
+        pids = first["columns"].index("pid")
+
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            time.sleep(0.1)
+            server.PROCESS_TABLE.get(max_age=0)
+            delta = server.process_changes(first["cursor"])
+            self.assertFalse(delta["reset"])
+            self.assertIn(child.pid, [row[pids] for row in delta["started"]])
+            self.assertLess(len(delta["started"]), len(first["started"]))
+        finally:
+            child.kill()
+            child.wait()
+        server.PROCESS_TABLE.get(max_age=0)
+        gone = server.process_changes(delta["cursor"])
+        self.assertIn(child.pid, gone["exited"])
+        self.assertNotIn(child.pid, [row[pids] for row in gone["started"]])
+
+    def test_short_lived_process_is_invisible(self):
+        cursor = server.process_changes()["cursor"]
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        time.sleep(0.1)
+        server.PROCESS_TABLE.get(max_age=0)
+        child.kill()
+        child.wait()
+        server.PROCESS_TABLE.get(max_age=0)
+        delta = server.process_changes(cursor)
+        self.assertNotIn(child.pid, delta["exited"])
+        self.assertNotIn(child.pid, [row[0] for row in delta["started"]])
+
+    def test_invalid_cursor_resets(self):
+        self.assertTrue(server.process_changes("stale:1")["reset"])
+        self.assertTrue(server.process_changes("garbage")["reset"])
+        self.assertIn("error", server.process_changes(fields=["nope"]))
+
+    def test_significant_change_only(self):
+        table = server.ProcessTable()
+        row = {"pid": 1, "create_time": 1.0, "status": "sleeping", "cpu_percent": 1.0, "rss_mb": 50.0}
+        table._record_changes({1: row})
+        table._record_changes({1: {**row, "cpu_percent": 2.0, "rss_mb": 55.0}})
+        table._record_changes({1: {**row, "cpu_percent": 40.0}})
+        self.assertEqual([len(c[2]) for c in table.changes], [0, 0, 1])
+        self.assertEqual([len(c[1]) for c in table.changes], [1, 0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
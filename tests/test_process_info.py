@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import subprocess
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestProcessInfo(unittest.TestCase):
+    def setUp(self):
+        self.children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]) for _ in range(10)]
+        self.busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        self.saved_taken = server.PROCESS_TABLE.taken
+        server.PROCESS_TABLE.taken = 0.0  # force the shared sampling window
+
+    def tearDown(self):
+        server.PROCESS_TABLE.taken = self.saved_taken
+        for child in self.children + [self.busy]:
+            child.kill()
+            child.wait()
+
+    def test_one_sampling_window(self):
+        pids = [c.pid for c in self.children] + [self.busy.pid]
+        start = time.perf_counter()
+        records = server.get_processes_info(pids, cpu_interval=0.2)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual([r["pid"] for r in records], pids)
+        self.assertGreater(records[-1]["cpu_percent"], 10)
+        for record in records:
+            self.assertEqual(set(record), {"pid", "name", "status", "cpu_percent", "memory_mb", "num_threads",
+                                           "create_time"})
+
+    def test_partial_results(self):
+        gone = self.children[0]
+        gone.kill()
+        gone.wait()
+        records = server.get_processes_info([gone.pid, os.getpid(), os.getpid()])
+        self.assertEqual(len(records), 2)
+        self.assertIn("error", records[0])
+        self.assertEqual(records[1]["pid"], os.getpid())
+
+    def test_single_pid_wrapper(self):
+        info = server.get_process_info(os.getpid())
+        self.assertEqual(info["pid"], os.getpid())
+        self.assertIn("error", server.get_process_info(999999999))
+
+if __name__ == '__main__':
+    unittest.main()
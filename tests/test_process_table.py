@@ -0,0 +1,54 @@
+import sys
+import time
+import subprocess
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestProcessTable(unittest.TestCase):
+    def setUp(self):
+        self.busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        self.table = server.ProcessTable()
+
+    def tearDown(self):
+        self.busy.kill()
+        self.busy.wait()
+
+    def test_cpu_is_a_real_delta(self):
+        rows, _ = self.table.get(max_age=0)
+        self.assertGreater(rows[self.busy.pid]["cpu_percent"], 10)
+        first = self.table.procs
+        rows, _ = self.table.get(max_age=0)
+        key = next(k for k in self.table.procs if k[0] == self.busy.pid)
+        self.assertIs(self.table.procs[key], first[key])
+
+    def test_ttl_shares_snapshot(self):
+        self.table.get(max_age=0)
+        scans = self.table.scans
+        for _ in range(5):
+            self.table.get(max_age=60)
+        self.assertEqual(self.table.scans, scans)
+
+    def test_exited_process_dropped(self):
+        self.table.get(max_age=0)
+        self.busy.kill()
+        self.busy.wait()
+        rows, _ = self.table.get(max_age=0)
+        self.assertNotIn(self.busy.pid, rows)
+
+    def test_list_processes_top_n(self):
+        server.PROCESS_TABLE.get(max_age=0)
+        time.sleep(0.2)
+        server.PROCESS_TABLE.get(max_age=0)
+        top = server.list_processes(limit=3)
+        self.assertEqual(len(top), 3)
+        self.assertEqual(set(top[0]), {"pid", "name", "cpu_percent", "memory_percent"})
+        self.assertEqual(top[0]["pid"], self.busy.pid)
+        self.assertIn("error", server.list_processes(sort_by="name")[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import time
+import subprocess
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+PARENT = ("import subprocess, sys, time; "
+          "kids = [subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']) for _ in range(3)]; "
+          "time.sleep(30)")
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get(self, max_age=None):
+        return self.rows, time.monotonic()
+
+def row(pid, ppid, cpu=0.0, rss=1.0, create_time=0.0):
+    return {"pid": pid, "ppid": ppid, "name": f"p{pid}", "cpu_percent": cpu, "rss_mb": rss, "num_threads": 1,
+            "create_time": create_time}
+
+class TestProcessTree(unittest.TestCase):
+    def setUp(self):
+        self.saved = server.PROCESS_TABLE
+
+    def tearDown(self):
+        server.PROCESS_TABLE = self.saved
+
+    def test_rollup_and_collapse(self):
+        rows = {1: row(1, 0), 2: row(2, 1, rss=100), 3: row(3, 2, cpu=50), 4: row(4, 1), 5: row(5, 1)}
+        server.PROCESS_TABLE = FakeTable(rows)
+        tree = server.process_tree()
+        root = tree["roots"][0]
+        self.assertEqual((root["total_rss_mb"], root["total_cpu"], root["descendants"]), (104.0, 50.0, 4))
+        self.assertEqual(root["children"][0]["pid"], 2)
+        self.assertEqual(root["children"][0]["children"][0]["pid"], 3)
+        self.assertEqual(root["children"][-1], {"other": 2, "total_cpu": 0.0, "total_rss_mb": 2.0})
+        self.assertNotIn("children", server.process_tree(max_depth=0)["roots"][0])
+        self.assertEqual(server.process_tree(root_pid=3)["roots"][0]["descendants"], 0)
+        self.assertIn("error", server.process_tree(root_pid=99))
+        self.assertIn("error", server.process_tree(sort_by="name"))
+
+    def test_recycled_ppid_is_not_a_child(self):
+        rows = {1: row(1, 0, create_time=100.0), 2: row(2, 1, create_time=101.0), 3: row(3, 1, create_time=50.0)}
+        server.PROCESS_TABLE = FakeTable(rows)
+        tree = server.process_tree(min_cpu=0, min_rss_mb=0)
+        self.assertEqual(sorted(r["pid"] for r in tree["roots"]), [1, 3])
+        self.assertEqual([c["pid"] for c in tree["roots"][0]["children"]], [2])
+
+    def test_ppid_cycle_terminates(self):
+        rows = {1: row(1, 0), 2: row(2, 3), 3: row(3, 2)}
+        server.PROCESS_TABLE = FakeTable(rows)
+        tree = server.process_tree(root_pid=2, min_cpu=0, min_rss_mb=0)
+        root = tree["roots"][0]
+        self.assertEqual(root["descendants"], 1)
+        self.assertEqual(root["children"][0]["pid"], 3)
+        self.assertNotIn("children", root["children"][0])
+
+    def test_large_flat_table(self):
+        rows = {1: row(1, 0)}
+        for pid in range(2, 30002):
+            rows[pid] = row(pid, 1 + (pid - 2) // 10 if pid > 11 else 1, rss=0.5)
+        server.PROCESS_TABLE = FakeTable(rows)
+        start = time.perf_counter()
+        tree = server.process_tree(max_depth=2)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(tree["roots"][0]["descendants"], 30000)
+
+    def test_live_subtree(self):
+        parent = subprocess.Popen([sys.executable, "-c", PARENT])
+        try:
+            time.sleep(0.5)
+            server.PROCESS_TABLE.get(max_age=0)
+            tree = server.process_tree(root_pid=parent.pid, min_cpu=0, min_rss_mb=0)
+            self.assertEqual(tree["roots"][0]["descendants"], 3)
+            self.assertEqual(len(tree["roots"][0]["children"]), 3)
+        finally:
+            server.kill_processes([parent.pid], tree=True, timeout=2)
+            parent.wait()
+
+if __name__ == '__main__':
+    unittest.main()
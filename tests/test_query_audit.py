@@ -0,0 +1,91 @@
+import sys
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+def _record(i, action, success=True):
+    return {"ts": (BASE + timedelta(seconds=i)).isoformat(), "action": action,
+            "success": success, "details": f"detail {i}", "digest": "", "duration_ms": None}
+
+class TestQueryAudit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (server.AUDIT_LOG, server.AUDIT_WRITER)
+        server.AUDIT_LOG = Path(self.tmp.name) / "audit.jsonl"
+        server.AUDIT_WRITER = server.AuditWriter(server.AUDIT_LOG)
+        # 3000 records: the first 2000 in a rotated, compressed segment, the rest live.
+        actions = ["run_command", "kill_process", "write_file"]
+        rotated = server.AUDIT_LOG.with_name("audit.jsonl.20260101120000000000")
+        with open(rotated, "w") as f:
+            for i in range(2000):
+                f.write(json.dumps(_record(i, actions[i % 3], i % 5 != 0)) + "\n")
+        server._compress_audit_segment(rotated, Path(f"{rotated}.gz"))
+        rotated.unlink()
+        with open(server.AUDIT_LOG, "w") as f:
+            for i in range(2000, 3000):
+                f.write(json.dumps(_record(i, actions[i % 3])) + "\n")
+            # Two records sharing one timestamp straddle a page boundary below.
+            f.write(json.dumps(_record(3000, "kill_process")) + "\n")
+            f.write(json.dumps(_record(3000, "kill_process")) + "\n")
+
+    def tearDown(self):
+        server.AUDIT_LOG, server.AUDIT_WRITER = self.saved
+        server._audit_live_index.pop(str(Path(self.tmp.name) / "audit.jsonl"), None)
+        self.tmp.cleanup()
+
+    def test_time_range_spanning_segments(self):
+        since = (BASE + timedelta(seconds=1990)).isoformat()
+        until = (BASE + timedelta(seconds=2009)).isoformat()
+        result = server.query_audit(since=since, until=until, limit=100)
+        self.assertEqual(len(result["records"]), 20)
+        self.assertEqual(result["records"][0]["details"], "detail 1990")
+        self.assertIsNone(result["next_page_token"])
+
+    def test_filters(self):
+        result = server.query_audit(action="kill_process", success=False, limit=1000)
+        self.assertTrue(all(r["action"] == "kill_process" and not r["success"] for r in result["records"]))
+        self.assertEqual(server.query_audit(contains="DETAIL 2500")["records"][0]["details"], "detail 2500")
+
+    def test_pagination_over_equal_timestamps(self):
+        since = (BASE + timedelta(seconds=2998)).isoformat()
+        seen, token = [], None
+        while True:
+            page = server.query_audit(since=since, action="kill_process", limit=1, page_token=token)
+            seen.extend(r["ts"] for r in page["records"])
+            token = page["next_page_token"]
+            if not token:
+                break
+        # 2998 plus the two records sharing 3000's timestamp, each exactly once.
+        self.assertEqual(seen, [(BASE + timedelta(seconds=t)).isoformat() for t in (2998, 3000, 3000)])
+
+    def test_live_index_resets_when_file_replaced(self):
+        server._live_audit_index(server.AUDIT_LOG)
+        # A rotated-in segment that is already larger than the indexed offset.
+        fresh = server.AUDIT_LOG.with_name("audit.jsonl.new")
+        with open(fresh, "w") as f:
+            for i in range(5000, 7000):
+                f.write(json.dumps(_record(i, "write_file")) + "\n")
+        fresh.replace(server.AUDIT_LOG)
+        index = server._live_audit_index(server.AUDIT_LOG)
+        self.assertEqual(index[0], [(BASE + timedelta(seconds=5000)).isoformat(), 0])
+        self.assertEqual(server.query_audit(contains="detail 6500")["records"][0]["details"], "detail 6500")
+
+    def test_buckets(self):
+        result = server.query_audit(until=(BASE + timedelta(seconds=599)).isoformat(),
+                                    limit=1, bucket_seconds=300)
+        self.assertEqual(result["total_matched"], 600)
+        first = result["buckets"][BASE.isoformat()]
+        self.assertEqual(sum(first.values()), 300)
+        self.assertEqual(first["run_command"], 100)
+
+if __name__ == '__main__':
+    unittest.main()
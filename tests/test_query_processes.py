@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import subprocess
+import unittest
+import psutil
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestQueryProcesses(unittest.TestCase):
+    def setUp(self):
+        self.children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", f"omnis-q-{i}"])
+                         for i in range(3)]
+        time.sleep(0.2)
+        server.PROCESS_TABLE.get(max_age=0)
+
+    def tearDown(self):
+        for child in self.children:
+            child.kill()
+            child.wait()
+
+    def test_cmdline_and_parent_filters(self):
+        result = server.query_processes(cmdline=r"omnis-q-\d", ppid=os.getpid(), fields=["pid", "ppid"])
+        self.assertEqual(result["matched"], 3)
+        self.assertEqual(result["columns"], ["pid", "ppid"])
+        self.assertEqual(sorted(r[0] for r in result["rows"]), sorted(c.pid for c in self.children))
+        self.assertTrue(all(r[1] == os.getpid() for r in result["rows"]))
+
+    def test_sort_limit_and_user(self):
+        result = server.query_processes(cmdline="omnis-q-", sort_by="pid", descending=False, limit=2,
+                                        user=psutil.Process().username())
+        self.assertEqual(result["matched"], 3, result)
+        self.assertEqual([r[0] for r in result["rows"]], sorted(c.pid for c in self.children)[:2])
+        self.assertGreaterEqual(result["snapshot_age_s"], 0)
+
+    def test_numeric_filters(self):
+        result = server.query_processes(cmdline="omnis-q-", min_rss_mb=100_000)
+        self.assertEqual(result["matched"], 0)
+
+    def test_errors(self):
+        self.assertIn("error", server.query_processes(fields=["secret"]))
+        self.assertIn("error", server.query_processes(name="("))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import base64
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestRangedReadFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        server.SAFE_ZONE = Path(self.tmp.name).resolve()
+        self.path = server.SAFE_ZONE / "big.log"
+        # Enough lines to span many index blocks.
+        self.path.write_text("".join(f"line {i}\n" for i in range(1, 200001)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_line_range(self):
+        self.assertEqual(server.read_file(str(self.path), start_line=150000, end_line=150002),
+                         "line 150000\nline 150001\nline 150002\n")
+        self.assertEqual(server.read_file(str(self.path), start_line=1, end_line=1), "line 1\n")
+        self.assertEqual(server.read_file(str(self.path), start_line=200000), "line 200000\n")
+        self.assertEqual(server.read_file(str(self.path), start_line=300000), "")
+
+    def test_index_invalidated_on_change(self):
+        server.read_file(str(self.path), start_line=2, end_line=2)
+        self.path.write_text("a\nb\nc\n")
+        self.assertEqual(server.read_file(str(self.path), start_line=2, end_line=2), "b\n")
+        self.assertEqual(server.file_info(str(self.path))["line_count"], 3)
+
+    def test_byte_range_and_binary(self):
+        self.assertEqual(server.read_file(str(self.path), offset=5, length=3), "1\nl")
+        raw = server.read_file(str(self.path), length=4, binary=True)
+        self.assertEqual(base64.b64decode(raw), b"line")
+
+    def test_file_info(self):
+        info = server.file_info(str(self.path))
+        self.assertEqual(info["size"], self.path.stat().st_size)
+        self.assertEqual(info["encoding"], "utf-8")
+        self.assertFalse(info["line_count_exact"])
+        self.assertAlmostEqual(info["line_count"], 200000, delta=50000)
+        server.read_file(str(self.path), start_line=10, end_line=10)
+        self.assertEqual(server.file_info(str(self.path))["line_count"], 200000)
+        self.assertTrue(server.file_info(str(self.path))["line_count_exact"])
+
+    def test_restricted(self):
+        self.assertIn("RESTRICTED", server.read_file("/etc/hostname", offset=0, length=10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestRollbackStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name).resolve()
+        self.store = server.RollbackStore(root / ".rollback")
+        self.zone = root / "zone"
+        self.zone.mkdir()
+        server.SAFE_ZONE = self.zone
+        self.saved_store = server.ROLLBACK_STORE
+        server.ROLLBACK_STORE = self.store
+        server.CONFIG["max_rollback_versions"] = 3
+
+    def tearDown(self):
+        server.ROLLBACK_STORE = self.saved_store
+        self.store.db.close()
+        self.tmp.cleanup()
+
+    def blobs(self):
+        return [p for p in self.store.objects.rglob("*") if p.is_file()]
+
+    def test_same_name_different_dirs(self):
+        a, b = self.zone / "a" / "conf.json", self.zone / "b" / "conf.json"
+        server.write_file(str(a), "A1")
+        server.write_file(str(b), "B1")
+        server.write_file(str(a), "A2")
+        server.write_file(str(b), "B2")
+        self.assertEqual(len(self.store.versions(a)), 1)
+        self.assertEqual(len(self.store.versions(b)), 1)
+
+    def test_dedup_and_retention(self):
+        f = self.zone / "f.txt"
+        for i in range(10):
+            server.write_file(str(f), "same" if i % 2 else f"v{i}")
+        self.assertEqual(len(self.store.versions(f)), 3)
+        # "same" is stored once no matter how many versions reference it.
+        self.assertLessEqual(len(self.blobs()), 3)
+
+        g = self.zone / "g.txt"
+        server.write_file(str(g), "same")
+        server.write_file(str(g), "other")
+        self.assertLessEqual(len(self.blobs()), 4)
+
+    def test_restore(self):
+        f = self.zone / "f.txt"
+        server.write_file(str(f), "first")
+        server.write_file(str(f), "second")
+        version = server.list_rollbacks(str(f))[0]["version"]
+        self.assertIn("Restored", server.restore_rollback(str(f), version))
+        self.assertEqual(f.read_text(), "first")
+        self.assertEqual(server.restore_rollback(str(f), 999999)[:5], "Error")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import sys
 from pathlib import Path
 
@@ -26,11 +26,26 @@ class TestRoutines(unittest.TestCase):
     def test_deep_work_routine(self):
         run_deep_work(self.mock_server)
         
-        # Verify kill calls
-        self.mock_server.kill_process.assert_any_call("discord")
-        self.mock_server.kill_process.assert_any_call("steam")
+        # Verify distractions are killed in one call
+        self.mock_server.kill_processes.assert_called_once()
+        targets = self.mock_server.kill_processes.call_args[0][0]
+        self.assertIn("discord", targets)
+        self.assertIn("steam", targets)
+        self.mock_server.kill_process.assert_not_called()
         # Verify music
         self.mock_server.launch_application.assert_called_with("spotify")
 
+    def test_deep_work_through_server_proxy(self):
+        import omnis_nexus_server as server
+        with patch.object(server, "kill_processes") as kill, \
+                patch.object(server, "launch_application") as launch, \
+                patch.object(server, "notify_operator") as notify:
+            run_deep_work(server.ServerProxy())
+        kill.assert_called_once()
+        self.assertIn("discord", kill.call_args[0][0])
+        self.assertTrue(kill.call_args[1]["tree"])
+        launch.assert_called_with("spotify")
+        notify.assert_called_with("Deep Work", "Distractions eliminated. Focus.")
+
 if __name__ == '__main__':
     unittest.main()
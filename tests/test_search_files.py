@@ -0,0 +1,60 @@
+import sys
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestSearchFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name).resolve()
+        server.SAFE_ZONE = root
+        (root / "src").mkdir()
+        (root / "src" / "main.py").write_text("import os\n\ndef main():\n    return TODO_fix\n# end\n")
+        (root / "src" / "util.py").write_text("x = 1  # TODO later\ny = TODO\n")
+        (root / "build").mkdir()
+        (root / "build" / "out.py").write_text("TODO generated\n")
+        (root / "notes.md").write_text("todo in notes\n")
+        (root / "blob.bin").write_bytes(b"\x00\x01TODO\x00")
+        (root / ".gitignore").write_text("build/\n*.log\n")
+        (root / "debug.log").write_text("TODO log\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def search(self, pattern, **kwargs):
+        return asyncio.run(server.search_files(pattern, **kwargs))
+
+    def test_literal_with_gitignore_and_binary_skip(self):
+        result = self.search("TODO", regex=False)
+        files = {r["file"] for r in result["results"]}
+        self.assertEqual(files, {"src/main.py", "src/util.py"})
+        self.assertEqual(result["total_matches"], 3)
+
+    def test_regex_context_and_case(self):
+        result = self.search(r"^\s+return", context=1, include=["*.py"])
+        match = result["results"][0]["matches"][0]
+        self.assertEqual(match["line"], 4)
+        self.assertEqual(match["before"], ["def main():"])
+        self.assertEqual(match["after"], ["# end"])
+        files = {r["file"] for r in self.search("todo", ignore_case=True, exclude=["src"])["results"]}
+        self.assertEqual(files, {"notes.md"})
+
+    def test_cap_and_gitignore_toggle(self):
+        result = self.search("TODO", max_matches=1)
+        self.assertEqual(result["total_matches"], 1)
+        self.assertTrue(result["truncated"])
+        files = {r["file"] for r in self.search("TODO", use_gitignore=False)["results"]}
+        self.assertIn("build/out.py", files)
+        self.assertIn("debug.log", files)
+
+    def test_root_outside_safe_zone(self):
+        self.assertIn("error", self.search("root", path="/etc"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ from pathlib import Path
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from omnis_nexus_server import _validate_command, CONFIG
+from omnis_nexus_server import _validate_command, _invalidate_policy, CONFIG, check_commands, set_config, AhoCorasick
 
 class TestSecurity(unittest.TestCase):
     def setUp(self):
@@ -35,5 +35,42 @@ class TestSecurity(unittest.TestCase):
         self.assertTrue(_validate_command("echo hello"))
         self.assertFalse(_validate_command("cat secret.txt")) # Not in allowed list
 
+    def test_whitelist_chains(self):
+        """Every command in a chain must be whitelisted."""
+        CONFIG["command_whitelist_enabled"] = True
+        self.assertTrue(_validate_command("ls -la | echo done"))
+        self.assertFalse(_validate_command("ls; cat secret.txt"))
+        self.assertFalse(_validate_command("ls && cat secret.txt"))
+        self.assertFalse(_validate_command("echo hi | sh"))
+        self.assertFalse(_validate_command("echo $(cat secret.txt)"))
+        self.assertFalse(_validate_command("ls <(cat secret.txt)"))
+        self.assertFalse(_validate_command("echo hi >(cat > out.txt)"))
+        self.assertFalse(_validate_command("lsblk")) # token match, not prefix
+
+    def test_quoted_blocks(self):
+        """Blocked patterns are matched on de-quoted argv too."""
+        self.assertFalse(_validate_command('rm "-rf" /'))
+        self.assertFalse(_validate_command("echo ok\nrm -rf /tmp/x"))
+
+    def test_check_commands(self):
+        results = check_commands(["ls", "rm -rf /", "del  /s x"])
+        self.assertEqual([r["allowed"] for r in results], [True, False, False])
+        self.assertIn("rm -rf", results[1]["reason"])
+
+    def test_recompile_on_config_change(self):
+        self.assertTrue(_validate_command("shutdown now"))
+        CONFIG["blocked_commands"] = CONFIG["blocked_commands"] + ["shutdown"]
+        self.assertFalse(_validate_command("shutdown now"))
+        CONFIG["blocked_commands"][-1] = "reboot"  # in-place edits need an explicit invalidation
+        _invalidate_policy()
+        self.assertTrue(_validate_command("shutdown now"))
+        self.assertFalse(_validate_command("reboot"))
+
+    def test_aho_corasick(self):
+        matcher = AhoCorasick(["he", "she", "hers", "his"])
+        self.assertEqual(matcher.search("ushers"), "she")
+        self.assertEqual(matcher.search("ahis"), "his")
+        self.assertIsNone(matcher.search("hx"))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import time
+import threading
+import platform
+import tempfile
+import unittest
+import psutil
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+@unittest.skipIf(platform.system() == "Windows", "POSIX shell protocol")
+class TestShellSessions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        server.SAFE_ZONE = Path(self.tmp.name).resolve()
+        server.CONFIG["command_whitelist_enabled"] = False
+        server.CONFIG["blocked_commands"] = ["rm -rf", "del /s", "format"]
+        opened = server.open_shell(self.tmp.name)
+        self.assertIn("session_id", opened)
+        self.sid = opened["session_id"]
+
+    def tearDown(self):
+        server.close_shell(self.sid)
+        self.tmp.cleanup()
+
+    def test_state_persists(self):
+        """cwd and env survive between commands."""
+        server.shell_exec(self.sid, "mkdir sub && cd sub && export OMNIS_T=42")
+        out = server.shell_exec(self.sid, 'pwd; echo "v=$OMNIS_T"')
+        self.assertIn(str(Path(self.tmp.name).resolve() / "sub"), out)
+        self.assertIn("v=42", out)
+        self.assertTrue(out.endswith("Exit: 0"))
+
+    def test_exit_code_and_stderr(self):
+        out = server.shell_exec(self.sid, "printf partial; echo oops >&2; false")
+        self.assertIn("STDOUT:\npartial\n", out)
+        self.assertIn("oops", out)
+        self.assertTrue(out.endswith("Exit: 1"))
+
+    def test_blocked_command(self):
+        self.assertEqual(server.shell_exec(self.sid, "rm -rf /"), "ERROR: Command blocked by policy")
+
+    def test_timeout_drops_session(self):
+        shell = server.SHELL_SESSIONS[self.sid]
+        out = server.shell_exec(self.sid, "sleep 37", timeout=1)
+        self.assertIn("timed out", out)
+        self.assertNotIn(self.sid, server.SHELL_SESSIONS)
+        self.assertIsNotNone(shell.proc.poll())  # killed and reaped
+        orphans = [p for p in psutil.process_iter(["cmdline"]) if p.info["cmdline"] == ["sleep", "37"]]
+        self.assertEqual(orphans, [])
+
+    def test_failed_cd_closes_shell(self):
+        target = Path(self.tmp.name) / "not_a_dir"
+        target.write_text("x")
+        acquired = []
+        acquire = server._acquire_shell
+        with mock.patch.object(server, "_acquire_shell", side_effect=lambda: acquired.append(acquire()) or acquired[-1]):
+            result = server.open_shell(str(target))
+        self.assertIn("cd failed", result["error"])
+        self.assertIsNotNone(acquired[0].proc.poll())
+
+@unittest.skipIf(platform.system() == "Windows", "POSIX shell protocol")
+class TestShellPool(unittest.TestCase):
+    def tearDown(self):
+        with server._shell_lock:
+            pooled, server.SHELL_POOL[:] = list(server.SHELL_POOL), []
+        for shell in pooled:
+            shell.close()
+
+    def test_pooled_shell_starts_fresh(self):
+        server._warm_shell_pool()
+        with server._shell_lock:
+            for shell in server.SHELL_POOL:
+                shell.last_used -= 10_000
+        shell = server._acquire_shell()
+        try:
+            self.assertLess(time.time() - shell.last_used, 5)
+        finally:
+            shell.close()
+
+    def test_concurrent_warmups_do_not_overfill(self):
+        threads = [threading.Thread(target=server._warm_shell_pool) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(len(server.SHELL_POOL), server.CONFIG.get("shell_pool_size", 2))
+
+if __name__ == '__main__':
+    unittest.main()
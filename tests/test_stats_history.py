@@ -0,0 +1,78 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+T0 = 1_700_000_000.0
+
+class TestTimeSeriesStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = server.TimeSeriesStore(Path(self.tmp.name) / "history.bin", max_metrics=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rollups(self):
+        for i in range(120):
+            self.store.record({"cpu": i % 60}, ts=T0 + i)
+        now = T0 + 119
+        seconds = self.store.query("cpu", 600, 0, now=now)
+        self.assertEqual(len(seconds), 120)
+        minutes = self.store.query("cpu", 3600, 1, now=now)
+        self.assertEqual(len(minutes), 3)  # T0 is not minute-aligned
+        self.assertEqual([r[1] for r in minutes], [0, 0, 40])
+        self.assertEqual(minutes[0][1:], [0, 39, 19.5])
+
+    def test_ring_is_bounded(self):
+        for i in range(1000):
+            self.store.record({"cpu": 1.0}, ts=T0 + i)
+        rows = self.store.query("cpu", 10_000, 0, now=T0 + 999)
+        self.assertEqual(len(rows), 600)
+        self.assertEqual(rows[0][0], T0 + 400)
+        self.assertEqual(self.store.memory_bytes(), sum(c for _, c in server.HISTORY_TIERS) * 5 * 8)
+
+    def test_metric_cap(self):
+        self.store.record({"a": 1, "b": 2, "c": 3}, ts=T0)
+        self.assertEqual(self.store.metrics(), ["a", "b"])
+        self.assertEqual(self.store.dropped_metrics, 1)
+
+    def test_snapshot_round_trip(self):
+        for i in range(90):
+            self.store.record({"cpu": i, "mem": 50}, ts=T0 + i)
+        self.store.save()
+        restored = server.TimeSeriesStore(self.store.path)
+        self.assertTrue(restored.load())
+        for level in range(3):
+            self.assertEqual(restored.query("cpu", 86400, level, now=T0 + 89),
+                             self.store.query("cpu", 86400, level, now=T0 + 89))
+
+class TestStatsHistoryTool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = server.HISTORY
+        server.HISTORY = server.TimeSeriesStore(Path(self.tmp.name) / "history.bin")
+
+    def tearDown(self):
+        server.HISTORY = self.saved
+        self.tmp.cleanup()
+
+    def test_tool(self):
+        server.HISTORY.record({"test_metric": 5.0})
+        listing = server.stats_history()
+        self.assertIn("test_metric", listing["metrics"])
+        result = server.stats_history("test_metric", window="5m")
+        self.assertEqual(result["resolution_s"], 1)
+        self.assertEqual(result["rows"][-1][1:], [5.0, 5.0, 5.0])
+        self.assertEqual(server.stats_history("test_metric", window="2d")["resolution_s"], 900)
+        self.assertIn("error", server.stats_history("nope"))
+        self.assertIn("error", server.stats_history("test_metric", window="soon"))
+        self.assertIn("error", server.stats_history("test_metric", resolution="1h"))
+
+if __name__ == '__main__':
+    unittest.main()
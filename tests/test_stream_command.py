@@ -0,0 +1,61 @@
+import sys
+import asyncio
+import platform
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+@unittest.skipIf(platform.system() == "Windows", "POSIX shell syntax")
+class TestStreamCommand(unittest.TestCase):
+    def setUp(self):
+        server.CONFIG["command_whitelist_enabled"] = False
+        server.CONFIG["blocked_commands"] = ["rm -rf", "del /s", "format"]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_dir = server.OUTPUT_DIR
+        server.OUTPUT_DIR = Path(self.tmp.name)
+
+    def tearDown(self):
+        server.OUTPUT_DIR = self.saved_dir
+        self.tmp.cleanup()
+
+    def test_small_output_stays_in_memory(self):
+        result = asyncio.run(server.stream_command("echo hello; echo err >&2; exit 3"))
+        self.assertEqual(result["stdout"], "hello\n")
+        self.assertEqual(result["stderr"], "err\n")
+        self.assertEqual(result["exit_code"], 3)
+        self.assertNotIn("handle", result)
+
+    def test_large_output_spills_and_pages(self):
+        result = asyncio.run(server.stream_command("seq 1 20000", max_bytes=1024))
+        self.assertTrue(result["truncated"])
+        self.assertEqual(len(result["stdout"]), 1024)
+        total = result["stdout_bytes"]
+
+        data, offset = "", 0
+        while True:
+            page = server.read_command_output(result["handle"], offset=offset, limit=30000)
+            data += page["data"]
+            offset = page["next_offset"]
+            if page["eof"]:
+                break
+        self.assertEqual(len(data), total)
+        self.assertTrue(data.endswith("19999\n20000\n"))
+
+    def test_binary_output_is_not_fatal(self):
+        result = asyncio.run(server.stream_command("printf '\\377\\376ok'"))
+        self.assertIn("ok", result["stdout"])
+
+    def test_timeout(self):
+        result = asyncio.run(server.stream_command("sleep 10", timeout=1))
+        self.assertTrue(result["timed_out"])
+
+    def test_invalid_handle(self):
+        self.assertIn("error", server.read_command_output("../../etc/passwd"))
+
+if __name__ == '__main__':
+    unittest.main()
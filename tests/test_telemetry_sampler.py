@@ -0,0 +1,48 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import omnis_nexus_server as server
+
+class TestTelemetrySampler(unittest.TestCase):
+    def setUp(self):
+        self.assertIsNotNone(server.TELEMETRY.get(timeout=5))
+
+    def test_system_stats_does_not_block(self):
+        start = time.perf_counter()
+        for _ in range(20):
+            stats = server.system_stats()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        for key in ("cpu_percent", "memory_percent", "available_gb", "battery", "snapshot_age_s"):
+            self.assertIn(key, stats)
+        self.assertGreaterEqual(stats["snapshot_age_s"], 0)
+
+    def test_snapshot_is_immutable(self):
+        snap = server.TELEMETRY.snapshot
+        with self.assertRaises(TypeError):
+            snap["cpu_percent"] = 99
+        stats = server.system_stats()
+        stats["cpu_percent"] = -1
+        self.assertNotEqual(server.TELEMETRY.snapshot["cpu_percent"], -1)
+
+    def test_sampler_refreshes(self):
+        before = server.TELEMETRY.samples
+        server.TELEMETRY.wakeup.set()
+        deadline = time.time() + 5
+        while server.TELEMETRY.samples == before and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertGreater(server.TELEMETRY.samples, before)
+
+    def test_disk_and_network_from_snapshot(self):
+        disks = server.disk_stats()
+        self.assertIsInstance(disks, list)
+        for part in disks:
+            self.assertIn("mountpoint", part)
+        self.assertIsInstance(server.network_stats(), dict)
+
+if __name__ == '__main__':
+    unittest.main()